@@ -0,0 +1,63 @@
+"""
+Import time of the numeric core, each module measured in a fresh interpreter.
+
+    python -m benchmarks.import_time [--repeat 5] [--output import_time.json]
+
+Exits with an error when a core module pulls in a plotting package.
+"""
+import argparse
+import json
+import pathlib
+import subprocess
+import sys
+from typing import Dict, List
+
+repository_path = pathlib.Path(__file__).parent.parent.resolve()
+
+core_modules = ("transformations.Clarke", "transformations.Park", "transformations.batch", "transformations.sampling",
+                "switching_states", "voltages_calculator", "sector_symmetry", "dual_svm_time_calculation",
+                "hexagon_svm", "switching_sequence")
+forbidden_modules = ("matplotlib",)
+
+_probe = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure(module: str, repeat: int = 5) -> Dict:
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", _probe.format(module=module)], cwd=repository_path,
+                                capture_output=True, text=True, check=True)
+        runs.append(json.loads(result.stdout))
+    loaded = set(runs[0]["modules"])
+    return {"module": module,
+            "seconds": min(run["seconds"] for run in runs),
+            "forbidden": sorted(name for name in forbidden_modules if name in loaded)}
+
+
+def measure_all(modules=core_modules, repeat: int = 5) -> List[Dict]:
+    return [measure(module, repeat) for module in modules]
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=pathlib.Path)
+    arguments = parser.parse_args(arguments)
+
+    results = measure_all(repeat=arguments.repeat)
+    for result in results:
+        flag = f"  loads {', '.join(result['forbidden'])}" if result["forbidden"] else ""
+        print(f"{result['module']:<32}{result['seconds'] * 1000:8.1f} ms{flag}")
+    if arguments.output:
+        arguments.output.write_text(json.dumps(results, indent=2))
+    return 1 if any(result["forbidden"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
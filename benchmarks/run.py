@@ -0,0 +1,334 @@
+"""
+Benchmarks of the hot paths over input sizes from 10^3 to 10^7, fully offline with synthetic inputs.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline baseline.json --tolerance 0.2
+    python -m benchmarks.run --only sampling --sizes 1e3 1e5
+
+Every result records the best time over the repeats, the throughput (size / seconds) and the peak memory
+traced during one extra run. Per-object Python paths are capped (max_size) unless --full is given. With a
+baseline, any benchmark whose throughput drops by more than the tolerance is reported and the exit code is 1.
+"""
+import argparse
+import atexit
+import json
+import pathlib
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+
+default_sizes = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7)
+benchmarks: Dict[str, "Benchmark"] = {}
+
+
+class Benchmark:
+    def __init__(self, name: str, setup: Callable[[int, np.random.Generator], Callable[[], object]],
+                 max_size: int = None):
+        self.name = name
+        self.setup = setup
+        self.max_size = max_size
+
+
+def benchmark(name: str, max_size: int = None):
+    """ Registers setup(size, rng), which prepares the inputs and returns the function to time. """
+
+    def register(setup):
+        benchmarks[name] = Benchmark(name, setup, max_size)
+        return setup
+
+    return register
+
+
+class Signal:
+    def __init__(self, out):
+        self.out = out
+
+
+def _triangular(size: int, samples_per_period: int = 200) -> np.array:
+    phase = (np.arange(size) % samples_per_period) / samples_per_period
+    return np.where(phase < 0.5, 4 * phase - 1, 3 - 4 * phase)
+
+
+def _modulating(size: int) -> np.array:
+    return 0.8 * np.sin(np.linspace(0, 2 * np.pi * 50, size))
+
+
+def _references(size: int, rng: np.random.Generator) -> np.array:
+    return rng.uniform(-1.5, 1.5, (size, 2))
+
+
+@benchmark("clark")
+def _clark(size, rng):
+    from transformations.Clarke import clark
+    signal = rng.normal(size=(3, size))
+    return lambda: clark(signal)
+
+
+@benchmark("inv_clark")
+def _inv_clark(size, rng):
+    from transformations.Clarke import inv_clark
+    signal = rng.normal(size=(3, size))
+    return lambda: inv_clark(signal)
+
+
+@benchmark("park")
+def _park(size, rng):
+    from transformations.Park import park
+    signal, theta = rng.normal(size=(3, size)), rng.uniform(0, 2 * np.pi, size)
+    return lambda: park(theta, signal)
+
+
+@benchmark("inv_park")
+def _inv_park(size, rng):
+    from transformations.Park import inv_park
+    theta = rng.uniform(0, 2 * np.pi, size)
+    return lambda: inv_park(theta, np.array([1.0, 0.5, 0.0]))
+
+
+@benchmark("abc_to_dq")
+def _abc_to_dq(size, rng):
+    from transformations.batch import abc_to_dq
+    signal, theta = rng.normal(size=(3, size)), rng.uniform(0, 2 * np.pi, size)
+    out = np.empty_like(signal)
+    return lambda: abc_to_dq(theta, signal, out=out)
+
+
+@benchmark("Sector.find_components", max_size=10 ** 5)
+def _find_components(size, rng):
+    from dual_svm_time_calculation import base_sector
+    from sector_symmetry import Point
+    sector = base_sector()
+    points = [Point(alpha, beta) for alpha, beta in rng.uniform(0, 1.5, (size, 2))]
+    return lambda: [sector.find_components(point) for point in points]
+
+
+@benchmark("Sector.find_components_batch")
+def _find_components_batch(size, rng):
+    from dual_svm_time_calculation import base_sector
+    sector, points = base_sector(), rng.uniform(0, 1.5, (size, 2))
+    return lambda: sector.find_components_batch(points)
+
+
+@benchmark("HexagonSVM.solve")
+def _hexagon_solve(size, rng):
+    from hexagon_svm import HexagonSVM
+    engine, points = HexagonSVM(), _references(size, rng)
+    return lambda: engine.solve(points)
+
+
+@benchmark("natural_sampling", max_size=10 ** 6)
+def _natural_sampling(size, rng):
+    from transformations.sampling import natural_sampling
+    carrier, modulated = Signal(_triangular(size).tolist()), Signal(_modulating(size).tolist())
+    return lambda: natural_sampling(carrier, modulated)
+
+
+@benchmark("uniform_sampling", max_size=10 ** 6)
+def _uniform_sampling(size, rng):
+    from transformations.sampling import uniform_sampling
+    carrier, modulated = Signal(_triangular(size).tolist()), Signal(_modulating(size).tolist())
+
+    def enable_read(delta, old_delta, read_enabled, y):
+        return True if delta * old_delta < 0 else read_enabled
+
+    def read(read_enabled, ym, y, old_value, hold):
+        return ym, False
+
+    return lambda: uniform_sampling(carrier, modulated, enable_read, read)
+
+
+@benchmark("symmetrical_sampling", max_size=10 ** 6)
+def _symmetrical_sampling(size, rng):
+    from transformations.sampling import symmetrical_sampling
+    carrier, modulated = Signal(_triangular(size).tolist()), Signal(_modulating(size).tolist())
+    return lambda: symmetrical_sampling(carrier, modulated)
+
+
+@benchmark("asymmetrical_sampling", max_size=10 ** 6)
+def _asymmetrical_sampling(size, rng):
+    from transformations.sampling import asymmetrical_sampling
+    carrier, modulated = Signal(_triangular(size).tolist()), Signal(_modulating(size).tolist())
+    return lambda: asymmetrical_sampling(carrier, modulated)
+
+
+@benchmark("natural_sampling_array")
+def _natural_sampling_array(size, rng):
+    from transformations.sampling import natural_sampling_array
+    carrier, modulated = Signal(_triangular(size)), Signal(_modulating(size))
+    return lambda: natural_sampling_array(carrier, modulated)
+
+
+@benchmark("symmetrical_sampling_array")
+def _symmetrical_sampling_array(size, rng):
+    from transformations.sampling import symmetrical_sampling_array
+    carrier, modulated = Signal(_triangular(size)), Signal(_modulating(size))
+    return lambda: symmetrical_sampling_array(carrier, modulated)
+
+
+@benchmark("asymmetrical_sampling_array")
+def _asymmetrical_sampling_array(size, rng):
+    from transformations.sampling import asymmetrical_sampling_array
+    carrier, modulated = Signal(_triangular(size)), Signal(_modulating(size))
+    return lambda: asymmetrical_sampling_array(carrier, modulated)
+
+
+@benchmark("natural_sampling_edges")
+def _natural_sampling_edges(size, rng):
+    from transformations.sampling import natural_sampling_edges
+    from transformations.signals import Sinusoid, TriangularCarrier
+    # Same carrier periods as the per sample benchmarks (200 samples per period), solved between the samples
+    sample_time = 1 / (200 * 10_000)
+    carrier = TriangularCarrier(10_000, sample_time, size)
+    # 50 modulating periods over the run, as _modulating
+    modulating = Sinusoid(50 / (size * sample_time), sample_time, size, 0.8)
+    return lambda: natural_sampling_edges(carrier, modulating)
+
+
+def _symbol(index: int) -> str:
+    # The variable parser only accepts symbols without digits
+    name = ""
+    index += 1
+    while index:
+        index, letter = divmod(index - 1, 26)
+        name = chr(ord("a") + letter) + name
+    return "v" + name
+
+
+def _variables_folder(size, rng) -> pathlib.Path:
+    folder = pathlib.Path(tempfile.mkdtemp(prefix="variables_"))
+    atexit.register(shutil.rmtree, folder, ignore_errors=True)
+    files = 10
+    dependencies = rng.integers(0, np.maximum(np.arange(size), 1))
+    lines = [f"{_symbol(0)} = 1.5"] + [f"{_symbol(i)} = {_symbol(int(dependencies[i]))} * 2 // derived"
+                                       for i in range(1, size)]
+    for index in range(files):
+        (folder / f"variables_{chr(ord('a') + index)}.txt").write_text("\n".join(lines[index::files]))
+    return folder
+
+
+@benchmark("read_variables", max_size=10 ** 5)
+def _read_variables(size, rng):
+    from document_loader import file_variables_reader
+    folder = _variables_folder(size, rng)
+
+    def read():
+        # Cold read: parse and evaluate everything again
+        file_variables_reader._caches.clear()
+        return file_variables_reader.read_variables(folder)
+
+    return read
+
+
+@benchmark("read_variables_warm", max_size=10 ** 5)
+def _read_variables_warm(size, rng):
+    from document_loader import file_variables_reader
+    folder = _variables_folder(size, rng)
+    # Warm read: nothing changed since the first call, only the stat scan and the per call copies remain
+    file_variables_reader.read_variables(folder)
+    return lambda: file_variables_reader.read_variables(folder)
+
+
+@benchmark("PointFromNumber", max_size=10 ** 6)
+def _point_from_number(size, rng):
+    from sector_symmetry import PointFromNumber
+    from switching_states import GROUPS
+    numbers = [GROUPS[group] for group in rng.integers(0, len(GROUPS), size)]
+    return lambda: [PointFromNumber(group) for group in numbers]
+
+
+@benchmark("SwitchingSequenceGenerator.generate")
+def _switching_sequence(size, rng):
+    from switching_sequence import SwitchingSequenceGenerator
+    generator = SwitchingSequenceGenerator(1e-4)
+    angle = np.linspace(0, 2 * np.pi * 50, size)
+    solved = generator.engine.solve(np.stack((np.cos(angle), np.sin(angle)), axis=1))
+    return lambda: generator.generate(*solved[:4])
+
+
+def run_benchmark(bench: Benchmark, size: int, repeat: int, seed: int = 0) -> Dict:
+    function = bench.setup(size, np.random.default_rng(seed))
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(times)
+    return {"name": bench.name, "size": size, "seconds": best, "throughput": size / best if best else None,
+            "peak_bytes": peak}
+
+
+def environment() -> Dict:
+    return {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+            "machine": platform.machine()}
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[Dict]:
+    """ Results whose throughput fell more than tolerance (a fraction) below the baseline. """
+    reference = {(result["name"], result["size"]): result for result in baseline}
+    regressions = []
+    for result in results:
+        previous = reference.get((result["name"], result["size"]))
+        if previous is None or not previous["throughput"] or result["throughput"] is None:
+            continue
+        ratio = result["throughput"] / previous["throughput"]
+        if ratio < 1 - tolerance:
+            regressions.append(dict(result, baseline_throughput=previous["throughput"], ratio=ratio))
+    return regressions
+
+
+def main(arguments=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=default_sizes)
+    parser.add_argument("--only", nargs="+", default=None, help="substrings of the benchmark names to run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--full", action="store_true", help="ignore the size caps of the per-object benchmarks")
+    parser.add_argument("--output", type=pathlib.Path)
+    parser.add_argument("--baseline", type=pathlib.Path)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--imports", action="store_true", help="also record the import times of the core")
+    arguments = parser.parse_args(arguments)
+
+    sizes = sorted({int(size) for size in arguments.sizes})
+    selected = [bench for name, bench in benchmarks.items()
+                if arguments.only is None or any(part in name for part in arguments.only)]
+
+    results = []
+    for bench in selected:
+        for size in sizes:
+            if bench.max_size is not None and size > bench.max_size and not arguments.full:
+                continue
+            result = run_benchmark(bench, size, arguments.repeat)
+            results.append(result)
+            print(f"{result['name']:<38}{size:>10}{result['seconds']:>12.4f} s{result['throughput']:>14.3e} /s"
+                  f"{result['peak_bytes'] / 2 ** 20:>10.1f} MiB", flush=True)
+
+    report = {"environment": environment(), "results": results}
+    if arguments.imports:
+        from benchmarks.import_time import measure_all
+        report["imports"] = measure_all()
+    if arguments.output:
+        arguments.output.write_text(json.dumps(report, indent=2))
+
+    if arguments.baseline:
+        regressions = compare(results, json.loads(arguments.baseline.read_text())["results"], arguments.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression['name']} size {regression['size']}: "
+                  f"{regression['ratio']:.2f}x of baseline throughput")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Common mode and zero sequence voltage of switching state sequences.
+
+Every per state quantity is a 64 entry table (switching_states.ZERO_SEQUENCE, COMMON_MODE columns), so the waveform
+of a state sequence is one gather and its statistics one reduction along the last axis. Sequences can be stacked
+as (K, N) arrays to evaluate K candidates at once, e.g. redundant state policies over a whole trajectory.
+"""
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from switching_states import GROUPS, REDUNDANCY_GROUP, ZERO_SEQUENCE
+
+policies = ("minimum", "maximum", "lowest")
+
+
+class CommonModeStatistics(NamedTuple):
+    peak: np.array
+    rms: np.array
+    mean: np.array
+    # Steps of the voltage (dv/dt events) and the largest one
+    events: np.array
+    max_step: np.array
+
+
+def waveform(states: np.array, table: np.array = ZERO_SEQUENCE) -> np.array:
+    return table[np.asarray(states)]
+
+
+def durations_from_timestamps(timestamps: np.array, end_time: float) -> np.array:
+    """ Length of every interval of SwitchingSequenceGenerator.generate output, the last one ending at end_time. """
+    timestamps = np.asarray(timestamps)
+    return np.diff(timestamps, append=np.full(timestamps.shape[:-1] + (1,), end_time), axis=-1)
+
+
+def statistics(states: np.array, durations: Optional[np.array] = None, table: np.array = ZERO_SEQUENCE,
+               previous_state: Optional[int] = None, tolerance: float = 1e-12) -> CommonModeStatistics:
+    """
+    Statistics along the last axis of (..., N) state sequences.
+
+    :param durations: time spent in every state, broadcast against states, equal durations by default
+    :param previous_state: state applied before the sequence, its step counts as an event
+    """
+    states = np.asarray(states)
+    values = table[states]
+    if durations is None:
+        durations = np.ones(values.shape)
+    durations = np.broadcast_to(np.asarray(durations, dtype=float), values.shape)
+    total = durations.sum(axis=-1)
+    # Empty (or zero length) sequences have NaN mean and rms, without warnings
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (values * durations).sum(axis=-1) / total
+        mean_square = (np.square(values) * durations).sum(axis=-1) / total
+
+    peak = np.abs(values).max(axis=-1, initial=0.0)
+    # The previous state only adds the step into the sequence, not its own value
+    if previous_state is not None:
+        values = np.concatenate((np.broadcast_to(table[previous_state], values.shape[:-1] + (1,)), values), axis=-1)
+    steps = np.abs(np.diff(values, axis=-1))
+    return CommonModeStatistics(peak, np.sqrt(mean_square), mean,
+                                np.count_nonzero(steps > tolerance, axis=-1),
+                                steps.max(axis=-1, initial=0.0))
+
+
+def policy(choice: str = "minimum", table: np.array = ZERO_SEQUENCE) -> np.array:
+    """
+    State applied for every redundancy group: the one with the smallest ("minimum") or largest ("maximum")
+    |table| value, or the lowest state number. Ties go to the lowest state.
+    """
+    if choice not in policies:
+        raise ValueError(f"Unknown policy {choice}, expected one of {policies}")
+    chosen = []
+    for group in GROUPS:
+        states = np.array(group)
+        magnitude = np.abs(table[states])
+        if choice == "minimum":
+            chosen.append(states[np.argmin(magnitude)])
+        elif choice == "maximum":
+            chosen.append(states[np.argmax(magnitude)])
+        else:
+            chosen.append(states[0])
+    return np.array(chosen)
+
+
+def apply_policy(policy_table: np.array, states: np.array) -> np.array:
+    """ Replaces every state by the one the policy picks for its redundancy group (same alpha/beta vector). """
+    return np.asarray(policy_table)[..., REDUNDANCY_GROUP[np.asarray(states)]]
+
+
+def rank_policies(policy_tables: np.array, states: np.array, durations: Optional[np.array] = None,
+                  table: np.array = ZERO_SEQUENCE, key: Tuple[str, ...] = ("rms", "peak", "events")) \
+        -> Tuple[np.array, CommonModeStatistics]:
+    """
+    Evaluates K redundant state policies, (K, groups) tables, over the same trajectory in one gather.
+
+    :param states: (N,) state sequence of the trajectory, only its redundancy groups matter
+    :return: policy indices from best to worst by the key statistics (first key most significant), and the
+     statistics of every policy
+    """
+    return rank_sequences(apply_policy(np.atleast_2d(policy_tables), states), durations, table, key)
+
+
+def rank_sequences(candidates: np.array, durations: Optional[np.array] = None, table: np.array = ZERO_SEQUENCE,
+                   key: Tuple[str, ...] = ("rms", "peak", "events")) -> Tuple[np.array, CommonModeStatistics]:
+    """ Same ranking for (K, N) candidate state sequences, e.g. the outputs of several sequence generators. """
+    found = statistics(candidates, durations, table)
+    order = np.lexsort(tuple(getattr(found, name) for name in reversed(key)))
+    return order, found
@@ -0,0 +1,94 @@
+from typing import Iterable, Iterator
+
+import numpy as np
+
+methods = ("tustin", "euler")
+
+
+class DiscretePIController:
+    """
+    Discretized PI, C(s) = K (1 + sT) / (sT), for a batch of independent controllers.
+
+    gain and time_constant broadcast to the batch shape, so d and q axes or many tuning candidates run in the
+    same vectorized step. Inputs to process have the batch shape plus a trailing time axis and can be given
+    in chunks: the integrator state is kept between calls.
+
+    When lower/upper limits are given the output is saturated and the integrator is clamped (conditional
+    integration) while the error pushes the output further into saturation.
+    """
+
+    def __init__(self, gain, time_constant, sample_time: float, method: str = "tustin", lower=None, upper=None):
+        if method not in methods:
+            raise ValueError(f"Unknown discretization {method}, expected one of {methods}")
+        gain, time_constant = np.broadcast_arrays(np.asarray(gain, dtype=float),
+                                                  np.asarray(time_constant, dtype=float))
+        self.method = method
+        self.sample_time = sample_time
+        self.proportional = gain.copy()
+        self.integral = gain * sample_time / time_constant
+        self.lower = lower
+        self.upper = upper
+        self.integrator = np.zeros(gain.shape)
+        self.previous_error = np.zeros(gain.shape)
+
+    @property
+    def saturated(self) -> bool:
+        return self.lower is not None or self.upper is not None
+
+    def reset(self):
+        self.integrator = np.zeros(self.proportional.shape)
+        self.previous_error = np.zeros(self.proportional.shape)
+
+    def step(self, error) -> np.array:
+        return self.process(np.asarray(error, dtype=float)[..., None])[..., 0]
+
+    def process(self, error) -> np.array:
+        error, _ = np.broadcast_arrays(np.asarray(error, dtype=float), self.proportional[..., None])
+        if error.shape[-1] == 0:
+            return np.empty(error.shape)
+        if self.saturated:
+            return self._process_saturated(error)
+
+        # Linear case: the integrator is a running sum of its increments
+        if self.method == "tustin":
+            previous_error = np.concatenate((self.previous_error[..., None], error[..., :-1]), axis=-1)
+            increment = self.integral[..., None] / 2 * (error + previous_error)
+        else:
+            increment = self.integral[..., None] * error
+        accumulated = np.cumsum(increment, axis=-1)
+        integrator = self.integrator[..., None] + accumulated
+        self.integrator = integrator[..., -1].copy()
+        if self.method == "euler":
+            # Forward Euler only adds the current error to the next sample
+            integrator -= increment
+        self.previous_error = error[..., -1].copy()
+        return self.proportional[..., None] * error + integrator
+
+    def _process_saturated(self, error: np.array) -> np.array:
+        lower = -np.inf if self.lower is None else self.lower
+        upper = np.inf if self.upper is None else self.upper
+        output = np.empty(error.shape)
+        integrator, previous_error = self.integrator, self.previous_error
+        for k in range(error.shape[-1]):
+            current = error[..., k]
+            if self.method == "tustin":
+                candidate = integrator + self.integral / 2 * (current + previous_error)
+                winding = _winding(self.proportional * current + candidate, current, lower, upper)
+                integrator = np.where(winding, integrator, candidate)
+                output[..., k] = self.proportional * current + integrator
+            else:
+                output[..., k] = self.proportional * current + integrator
+                winding = _winding(output[..., k], current, lower, upper)
+                integrator = np.where(winding, integrator, integrator + self.integral * current)
+            previous_error = current
+        self.integrator, self.previous_error = integrator, previous_error.copy()
+        return np.clip(output, lower, upper, out=output)
+
+    def process_chunks(self, chunks: Iterable) -> Iterator[np.array]:
+        for chunk in chunks:
+            yield self.process(chunk)
+
+
+def _winding(unsaturated: np.array, error: np.array, lower, upper) -> np.array:
+    """ Whether integrating the error would push an already saturated output further. """
+    return ((unsaturated > upper) & (error > 0)) | ((unsaturated < lower) & (error < 0))
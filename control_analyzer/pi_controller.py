@@ -1,7 +1,23 @@
+import numpy as np
 from control.matlab import tf
 
 
 class PIController:
 
     def __init__(self, gain: float, time_constant: float):
+        self.gain = gain
+        self.time_constant = time_constant
         self.transfer_function = gain * tf([time_constant, 1.0], [time_constant, 0.0])
+
+    def frequency_response(self, omega: np.array) -> np.array:
+        """ C(jw) = K (1 + jwT) / (jwT), evaluated in closed form. """
+        return pi_response(self.gain, self.time_constant, omega)
+
+    def discretize(self, sample_time: float, method: str = "tustin", lower=None, upper=None):
+        from control_analyzer.discrete_pi import DiscretePIController
+        return DiscretePIController(self.gain, self.time_constant, sample_time, method, lower, upper)
+
+
+def pi_response(gain, time_constant, omega: np.array) -> np.array:
+    s_t = 1j * np.multiply(omega, time_constant)
+    return gain * (1 + s_t) / s_t
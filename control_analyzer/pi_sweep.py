@@ -0,0 +1,120 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+import numpy as np
+
+from control_analyzer.pi_controller import pi_response
+
+
+class SweepResult:
+    """
+    Loop data for every (gain, time constant) pair, arrays are indexed [gain, time_constant].
+
+    Frequencies are in rad/s, margins in degrees and dB. Pairs without a crossover hold NaN.
+    """
+
+    def __init__(self, gains: np.array, time_constants: np.array, omega: np.array, crossover: np.array,
+                 phase_margin: np.array, phase_crossover: np.array, gain_margin: np.array,
+                 response: Optional[np.array] = None):
+        self.gains = gains
+        self.time_constants = time_constants
+        self.omega = omega
+        self.crossover = crossover
+        self.phase_margin = phase_margin
+        self.phase_crossover = phase_crossover
+        self.gain_margin = gain_margin
+        self.response = response
+
+    def stable(self) -> np.array:
+        return (self.phase_margin > 0) & ~(self.gain_margin < 0)
+
+
+def plant_response(plant, omega: np.array) -> np.array:
+    return np.squeeze(plant(1j * omega)).astype(complex)
+
+
+def _first_crossing(curve: np.array, log_omega: np.array) -> Tuple[np.array, np.array, np.array]:
+    """ First downward zero crossing of curve along the last axis, interpolated over log(omega). """
+    above = curve >= 0
+    crossing = above[..., :-1] & ~above[..., 1:]
+    found = crossing.any(axis=-1)
+    index = np.argmax(crossing, axis=-1)
+    before = np.take_along_axis(curve, index[..., None], axis=-1)[..., 0]
+    after = np.take_along_axis(curve, index[..., None] + 1, axis=-1)[..., 0]
+    fraction = before / (before - np.where(found, after, before - 1))
+    log_crossing = log_omega[index] + fraction * (log_omega[index + 1] - log_omega[index])
+    return found, index, np.where(found, log_crossing, np.nan)
+
+
+def _interpolate(values: np.array, index: np.array, log_omega: np.array, log_crossing: np.array) -> np.array:
+    before = np.take_along_axis(values, index[..., None], axis=-1)[..., 0]
+    after = np.take_along_axis(values, index[..., None] + 1, axis=-1)[..., 0]
+    fraction = (log_crossing - log_omega[index]) / (log_omega[index + 1] - log_omega[index])
+    return before + fraction * (after - before)
+
+
+def _sweep_chunk(gains: np.array, log_magnitude: np.array, phase: np.array, log_omega: np.array) \
+        -> Tuple[np.array, np.array]:
+    # |L| = K |C1 P|, only the magnitude depends on the gain
+    curve = np.log(gains)[:, None, None] + log_magnitude[None]
+    found, index, log_crossover = _first_crossing(curve, log_omega)
+    phase = np.broadcast_to(phase, curve.shape)
+    phase_margin = 180 + np.degrees(_interpolate(phase, index, log_omega, np.where(found, log_crossover, 0)))
+    phase_margin = (phase_margin + 180) % 360 - 180
+    return np.exp(log_crossover), np.where(found, phase_margin, np.nan)
+
+
+_worker_arguments = ()
+
+
+def _set_worker_arguments(*arguments):
+    global _worker_arguments
+    _worker_arguments = arguments
+
+
+def _worker_sweep_chunk(gains: np.array) -> Tuple[np.array, np.array]:
+    return _sweep_chunk(gains, *_worker_arguments)
+
+
+def sweep(gains: np.array, time_constants: np.array, plant, omega: np.array = None, workers: int = None,
+          chunk_size: int = 64, keep_response: bool = False) -> SweepResult:
+    """
+    Open loop PI * plant analysis over a gain x time constant grid.
+
+    :param plant: SISO transfer function, evaluated once over omega
+    :param workers: spread gain chunks over this many processes when larger than 1
+    :param chunk_size: gains handled per vectorized chunk, bounding the memory of the (gains, T, omega) arrays
+    """
+    gains = np.atleast_1d(np.asarray(gains, dtype=float))
+    time_constants = np.atleast_1d(np.asarray(time_constants, dtype=float))
+    omega = np.logspace(0, 6, 2000) if omega is None else np.asarray(omega, dtype=float)
+    log_omega = np.log(omega)
+
+    # PI with unit gain for every time constant: (T, omega)
+    unit_loop = pi_response(1.0, time_constants[:, None], omega[None]) * plant_response(plant, omega)[None]
+    log_magnitude = np.log(np.abs(unit_loop))
+    phase = np.unwrap(np.angle(unit_loop), axis=-1)
+    # Start every phase curve in (-360, 0] degrees so the -180 degrees crossing is found
+    phase -= 2 * np.pi * np.ceil(phase[:, :1] / (2 * np.pi))
+
+    chunks = [gains[start:start + chunk_size] for start in range(0, len(gains), chunk_size)]
+    arguments = (log_magnitude, phase, log_omega)
+    if workers is not None and workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_set_worker_arguments,
+                                 initargs=arguments) as executor:
+            results = list(executor.map(_worker_sweep_chunk, chunks))
+    else:
+        results = [_sweep_chunk(chunk, *arguments) for chunk in chunks]
+    crossover = np.concatenate([result[0] for result in results])
+    phase_margin = np.concatenate([result[1] for result in results])
+
+    # The phase does not depend on the gain, neither does the -180 degrees crossing
+    found, index, log_phase_crossover = _first_crossing(phase + np.pi, log_omega)
+    magnitude_at_crossover = _interpolate(log_magnitude, index, log_omega, np.where(found, log_phase_crossover, 0))
+    gain_margin = -20 / np.log(10) * (np.log(gains)[:, None] + magnitude_at_crossover[None])
+    gain_margin = np.where(found[None], gain_margin, np.nan)
+    phase_crossover = np.broadcast_to(np.exp(log_phase_crossover), crossover.shape)
+
+    response = gains[:, None, None] * unit_loop[None] if keep_response else None
+    return SweepResult(gains, time_constants, omega, crossover, phase_margin, phase_crossover, gain_margin,
+                       response)
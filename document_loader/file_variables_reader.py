@@ -1,14 +1,36 @@
+import operator
 import pathlib
 import re
 import math
+from collections import deque
 
-from typing import Dict
+from typing import Any, Callable, Dict, List, Mapping, Set, Tuple
+
+import numpy as np
 
 program_path = pathlib.Path(__file__).parent
 psim_path = program_path.parent.parent.resolve()
 variables_path = psim_path.joinpath(psim_path, "variables")
 
 prefix = {"k": 1000}
+constants = {"pi": math.pi}
+operators = {'+': operator.add,
+             '-': operator.sub,
+             '*': operator.mul,
+             '/': operator.truediv
+             }
+
+
+class VariableError(ValueError):
+    pass
+
+
+class UndefinedVariableError(VariableError):
+    pass
+
+
+class CyclicVariableError(VariableError):
+    pass
 
 
 def is_number_regex(s):
@@ -37,6 +59,7 @@ class Operation:
     def __init__(self, raw_operation: str):
         self.value = None
         self.symbol = None
+        self.operator = None
         if raw_operation[0] == "(":
             raw_operation = raw_operation[1:-1]
         arguments = re.split('[*+/-]', raw_operation, 1)
@@ -51,48 +74,221 @@ class Operation:
             self.first_operator = Operation(arguments[0])
             self.second_operator = Operation(arguments[1])
 
+    def copy(self) -> "Operation":
+        """ New top level node with the same value, sharing the (unchanged) operand trees. """
+        operation = Operation.__new__(Operation)
+        operation.__dict__.update(self.__dict__)
+        return operation
+
     def get_symbols(self) -> set:
         symbols = set()
-        if self.value:
-            return symbols
         if self.symbol:
             symbols.add(self.symbol)
             return symbols
+        if self.operator is None:
+            return symbols
         symbols = symbols.union(self.first_operator.get_symbols())
         symbols = symbols.union(self.second_operator.get_symbols())
         return symbols
 
+    def reset(self):
+        """ Forgets evaluated results, keeping literal values. """
+        if self.symbol is None and self.operator is None:
+            return
+        self.value = None
+        if self.operator is not None:
+            self.first_operator.reset()
+            self.second_operator.reset()
+
     def get_value(self, values: dict):
-        constants = {"pi": math.pi}
         if self.symbol in constants:
             return constants[self.symbol]
-        if self.value:
+        if self.value is not None:
             return self.value
         if self.symbol:
             return values[self.symbol].value
-        op = {'+': lambda x, y: x + y,
-              '-': lambda x, y: x - y,
-              '*': lambda x, y: x * y,
-              '/': lambda x, y: x / y
-              }
-        self.value = op[self.operator](self.first_operator.get_value(values), self.second_operator.get_value(values))
+        self.value = operators[self.operator](self.first_operator.get_value(values),
+                                              self.second_operator.get_value(values))
         return self.value
 
+    def compile(self) -> Callable[[Mapping[str, Any]], Any]:
+        """ Function evaluating the operation from a mapping of symbol values, without touching self.value. """
+        if self.symbol in constants:
+            constant = constants[self.symbol]
+            return lambda values: constant
+        if self.symbol:
+            symbol = self.symbol
+            return lambda values: values[symbol]
+        if self.operator is None:
+            value = self.value
+            return lambda values: value
+        function = operators[self.operator]
+        first, second = self.first_operator.compile(), self.second_operator.compile()
+        return lambda values: function(first(values), second(values))
+
 
-def read_variables() -> Dict:
-    variables = {}
-    to_process = set()
-    for variable_file in variables_path.iterdir():
-        for variable in variable_file.open().readlines():
+def parse_variable_file(variable_file: pathlib.Path) -> Dict[str, str]:
+    expressions = {}
+    with variable_file.open() as lines:
+        for variable in lines:
             variable = re.sub('(//)(.*)', "", variable).replace("\n", '').replace(" ", '')
             if variable.strip():
                 symbol, value = variable.split("=")
-                variables[symbol.strip()] = Operation(value)
-                if variables[symbol.strip()].value is None:
-                    to_process.add(symbol.strip())
-    while len(to_process) > 0:
-        for processing in to_process.copy():
-            if not variables[processing].get_symbols().intersection(to_process):
-                variables[processing].get_value(variables)
-                to_process.remove(processing)
-    return variables
+                expressions[symbol.strip()] = value
+    return expressions
+
+
+def get_dependencies(variables: Dict[str, Operation]) -> Dict[str, Set[str]]:
+    return {symbol: operation.get_symbols().difference(constants) for symbol, operation in variables.items()}
+
+
+def get_dependents(dependencies: Dict[str, Set[str]]) -> Dict[str, Set[str]]:
+    dependents = {symbol: set() for symbol in dependencies}
+    for symbol, used in dependencies.items():
+        for dependency in used:
+            dependents.setdefault(dependency, set()).add(symbol)
+    return dependents
+
+
+def _find_cycle(dependencies: Dict[str, Set[str]], remaining: Set[str]) -> List[str]:
+    path = [min(remaining)]
+    while True:
+        following = min(dependencies[path[-1]].intersection(remaining))
+        if following in path:
+            return path[path.index(following):] + [following]
+        path.append(following)
+
+
+def evaluation_order(variables: Dict[str, Operation], dependencies: Dict[str, Set[str]] = None) -> List[str]:
+    """ Topological order of the variables, raising on undefined symbols and cyclic definitions. """
+    if dependencies is None:
+        dependencies = get_dependencies(variables)
+    undefined = {f"{missing} (used by {symbol})" for symbol, used in dependencies.items()
+                 for missing in used if missing not in variables}
+    if undefined:
+        raise UndefinedVariableError("Undefined symbols: " + ", ".join(sorted(undefined)))
+
+    pending = {symbol: len(used) for symbol, used in dependencies.items()}
+    dependents = get_dependents(dependencies)
+    ready = deque(sorted(symbol for symbol, count in pending.items() if count == 0))
+    order = []
+    while ready:
+        symbol = ready.popleft()
+        order.append(symbol)
+        for dependent in dependents[symbol]:
+            pending[dependent] -= 1
+            if pending[dependent] == 0:
+                ready.append(dependent)
+    if len(order) < len(variables):
+        cycle = _find_cycle(dependencies, set(variables).difference(order))
+        raise CyclicVariableError("Cyclic definition: " + " -> ".join(cycle))
+    return order
+
+
+def _affected(dependents: Dict[str, Set[str]], changed: Set[str]) -> Set[str]:
+    affected = set(changed)
+    to_visit = list(changed)
+    while to_visit:
+        for dependent in dependents.get(to_visit.pop(), ()):
+            if dependent not in affected:
+                affected.add(dependent)
+                to_visit.append(dependent)
+    return affected
+
+
+class VariableCache:
+    """
+    Parsed files and evaluated variables of a variables folder.
+
+    Files are only parsed again when their modification time or size change, and only the variables defined
+    in changed files and the ones depending on them are evaluated again.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self.files: Dict[pathlib.Path, Tuple[Tuple[int, int], Dict[str, str]]] = {}
+        self.expressions: Dict[str, str] = {}
+        self.variables: Dict[str, Operation] = {}
+        self.dependencies: Dict[str, Set[str]] = {}
+
+    def _scan(self) -> Dict[pathlib.Path, Tuple[Tuple[int, int], Dict[str, str]]]:
+        files = {}
+        for variable_file in sorted(self.path.iterdir()):
+            if not variable_file.is_file():
+                continue
+            stat = variable_file.stat()
+            stamp = stat.st_mtime_ns, stat.st_size
+            cached = self.files.get(variable_file)
+            if cached is None or cached[0] != stamp:
+                cached = stamp, parse_variable_file(variable_file)
+            files[variable_file] = cached
+        return files
+
+    def update(self) -> Dict[str, Operation]:
+        files = self._scan()
+        if files.keys() == self.files.keys() and all(files[f] is self.files[f] for f in files):
+            return self.variables
+
+        expressions = {}
+        for _, file_expressions in files.values():
+            expressions.update(file_expressions)
+        changed = {symbol for symbol, expression in expressions.items() if self.expressions.get(symbol) != expression}
+        removed = set(self.expressions).difference(expressions)
+        variables = {symbol: Operation(expression) if symbol in changed else self.variables[symbol]
+                     for symbol, expression in expressions.items()}
+        dependencies = {symbol: self.dependencies[symbol] for symbol in variables if symbol not in changed}
+        dependencies.update(get_dependencies({symbol: variables[symbol] for symbol in changed}))
+
+        order = evaluation_order(variables, dependencies)
+        affected = _affected(get_dependents(dependencies), changed.union(removed))
+        for symbol in order:
+            if symbol in affected:
+                variables[symbol].reset()
+                variables[symbol].value = variables[symbol].get_value(variables)
+
+        self.files, self.expressions, self.variables, self.dependencies = files, expressions, variables, dependencies
+        return variables
+
+
+class CompiledVariables:
+    """
+    A variable set compiled once into functions that can be evaluated many times.
+
+    Any variable can be overridden with a scalar or a NumPy array, derived variables are then computed with
+    NumPy broadcasting, so a whole parameter sweep is a single pass::
+
+        sweep = CompiledVariables(read_variables())
+        values = sweep.evaluate(fs=np.linspace(5e3, 20e3, 1000)[:, None], Vdc=np.linspace(300, 700, 100))
+    """
+
+    def __init__(self, variables: Dict[str, Operation]):
+        self.order = evaluation_order(variables)
+        self.functions = [(symbol, variables[symbol].compile()) for symbol in self.order]
+
+    def evaluate(self, overrides: Mapping[str, Any] = None, **kwargs) -> Dict[str, Any]:
+        overrides = dict(overrides or {}, **kwargs)
+        unknown = set(overrides).difference(self.order)
+        if unknown:
+            raise UndefinedVariableError("Undefined symbols: " + ", ".join(sorted(unknown)))
+        overrides = {symbol: np.asarray(value) if isinstance(value, (list, tuple)) else value
+                     for symbol, value in overrides.items()}
+
+        values = {}
+        for symbol, function in self.functions:
+            values[symbol] = overrides[symbol] if symbol in overrides else function(values)
+        return values
+
+
+_caches: Dict[pathlib.Path, VariableCache] = {}
+
+
+def read_variables(path: pathlib.Path = variables_path) -> Dict:
+    path = pathlib.Path(path).resolve()
+    if path not in _caches:
+        _caches[path] = VariableCache(path)
+    # Callers own the returned operations, assigning their value must not leak into the cache
+    return {symbol: operation.copy() for symbol, operation in _caches[path].update().items()}
+
+
+def compile_variables(path: pathlib.Path = variables_path) -> CompiledVariables:
+    return CompiledVariables(read_variables(path))
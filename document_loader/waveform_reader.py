@@ -0,0 +1,120 @@
+import itertools
+import json
+import os
+import pathlib
+import struct
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+cache_suffix = ".wfcache"
+cache_magic = b"PSIMWF01"
+cache_alignment = 64
+cache_dtype = np.dtype("<f8")
+rows_per_block = 100_000
+
+
+class Channel:
+    """ One waveform column, exposed through the .out interface the sampling functions read. """
+
+    def __init__(self, name: str, out: np.array):
+        self.name = name
+        self.out = out
+
+    def __len__(self):
+        return len(self.out)
+
+    def __str__(self):
+        return f"Channel {self.name}: {len(self.out)} samples"
+
+
+def _source_stamp(source: pathlib.Path) -> Dict:
+    stat = source.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _is_data(line: str) -> bool:
+    return bool(line.strip())
+
+
+def _read_columns(line: str) -> Tuple[List[str], Optional[str]]:
+    delimiter = "," if "," in line else None
+    return [column.strip() for column in line.strip().split(delimiter)], delimiter
+
+
+def _data_offset(header: bytes) -> int:
+    size = len(cache_magic) + 8 + len(header)
+    return -(-size // cache_alignment) * cache_alignment
+
+
+def build_cache(source: pathlib.Path, cache_path: pathlib.Path) -> pathlib.Path:
+    """ Parses a PSIM text export once and stores it column by column in a binary cache file. """
+    with source.open() as export:
+        columns, delimiter = _read_columns(export.readline())
+        rows = sum(1 for line in export if _is_data(line))
+
+    header = json.dumps({"columns": columns, "rows": rows, "dtype": cache_dtype.str,
+                         "source": _source_stamp(source)}).encode()
+    offset = _data_offset(header)
+    # Per process name, so workers building the same export do not write into each other's file
+    temporary = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    with temporary.open("wb") as cache:
+        cache.write(cache_magic + struct.pack("<Q", len(header)) + header)
+        cache.truncate(offset + len(columns) * rows * cache_dtype.itemsize)
+
+    if rows:
+        data = np.memmap(temporary, dtype=cache_dtype, mode="r+", offset=offset, shape=(len(columns), rows))
+        with source.open() as export:
+            export.readline()
+            lines = (line for line in export if _is_data(line))
+            start = 0
+            for block in iter(lambda: list(itertools.islice(lines, rows_per_block)), []):
+                values = np.loadtxt(block, delimiter=delimiter, ndmin=2, dtype=cache_dtype)
+                data[:, start:start + len(values)] = values.transpose()
+                start += len(values)
+        data.flush()
+        del data
+    os.replace(temporary, cache_path)
+    return cache_path
+
+
+def _open_cache(cache_path: pathlib.Path, source: Optional[pathlib.Path]) -> Optional[Tuple[List[str], np.array]]:
+    try:
+        with cache_path.open("rb") as cache:
+            if cache.read(len(cache_magic)) != cache_magic:
+                return None
+            header_length, = struct.unpack("<Q", cache.read(8))
+            raw_header = cache.read(header_length)
+            header = json.loads(raw_header)
+        columns, rows, dtype = header["columns"], header["rows"], np.dtype(header["dtype"])
+        # A truncated file would make np.memmap raise instead of triggering a rebuild
+        if cache_path.stat().st_size < _data_offset(raw_header) + len(columns) * rows * dtype.itemsize:
+            return None
+    except (OSError, ValueError, KeyError, TypeError, struct.error):
+        return None
+    if source is not None and header["source"] != _source_stamp(source):
+        return None
+
+    if rows == 0:
+        return columns, np.empty((len(columns), 0), dtype=dtype)
+    data = np.memmap(cache_path, dtype=dtype, mode="r", offset=_data_offset(raw_header),
+                     shape=(len(columns), rows))
+    return columns, data
+
+
+def read_waveforms(source: Union[str, pathlib.Path], cache_path: Union[str, pathlib.Path] = None) \
+        -> Dict[str, Channel]:
+    """
+    Loads a PSIM waveform export, converting it to a memory mapped cache on first use.
+
+    The cache is rebuilt whenever the size or modification time of the export changes.
+    """
+    source = pathlib.Path(source)
+    cache_path = pathlib.Path(cache_path) if cache_path else source.with_name(source.name + cache_suffix)
+
+    opened = _open_cache(cache_path, source)
+    if opened is None:
+        build_cache(source, cache_path)
+        opened = _open_cache(cache_path, source)
+    columns, data = opened
+    return {column: Channel(column, data[index]) for index, column in enumerate(columns)}
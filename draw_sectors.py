@@ -18,5 +18,6 @@ def draw_all_sectors():
         draw_sectors((x, y))
 
 
-draw_all_sectors()
-plt.show()
+if __name__ == "__main__":
+    draw_all_sectors()
+    plt.show()
@@ -1,14 +1,29 @@
 import numpy as np
+from functools import lru_cache
 from typing import Tuple, Optional
-from matplotlib import pyplot as plt
-from sector_symmetry import PointFromNumber, Point, VoltageLevelVector, Vector
+import profiling
+from profiling import count, profiled
+from sector_symmetry import PointFromNumber, Point, VoltageLevelVector, Vector, PointSet, VectorSet, get_pyplot
 
-point0 = PointFromNumber(0)
-point1 = PointFromNumber((1, 19, 37, 48, 55, 57))
-point2 = PointFromNumber((3, 32, 39, 41, 50, 59))
-point3 = PointFromNumber(35)
-point4 = PointFromNumber((33, 51))
-point5 = PointFromNumber(49)
+base_point_numbers = (0, (1, 19, 37, 48, 55, 57), (3, 32, 39, 41, 50, 59), 35, (33, 51), 49)
+
+
+@lru_cache(maxsize=None)
+def base_points() -> Tuple[PointFromNumber, ...]:
+    """ point0 to point5 of the first sector, built on first use instead of at import. """
+    return tuple(PointFromNumber(numbers) for numbers in base_point_numbers)
+
+
+@lru_cache(maxsize=None)
+def base_sector():
+    return Sector(*base_points()[1:])
+
+
+def __getattr__(name: str):
+    # Keeps the former module level point0 ... point5 available
+    if name.startswith("point") and name[5:].isdigit() and int(name[5:]) < len(base_point_numbers):
+        return base_points()[int(name[5:])]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class Space:
@@ -22,41 +37,94 @@ class Space:
         self.voltage_vectors = [ab, ac, bc]
 
         self.space = np.vstack((ab.to_array().reshape(1, -1), ac.to_array().reshape(1, -1))).reshape(2, 2).transpose()
+        self.origin = np.array([point_a.alpha, point_a.beta], dtype=float)
+        # Transposed inverse, so that row vectors of alpha/beta map straight to (u, v)
+        self.inverse_transposed = np.linalg.inv(self.space).transpose()
 
+    @profiled("Space.calculate_components")
     def calculate_components(self, point: Point) -> Tuple[float, float]:
+        count("solves")
         u, v = np.linalg.solve(self.space, Vector(self.A, point).to_array())
         return u[0], v[0]
 
+    def calculate_components_batch(self, points: np.array) -> np.array:
+        """ Components of an (N, 2) array of alpha/beta points, returned as an (N, 2) array of (u, v). """
+        count("solves", len(points))
+        return np.matmul(points - self.origin, self.inverse_transposed)
+
     def __str__(self):
         return f"A {self.A}\nB {self.B}\nC {self.C}"
 
-    def plot(self, plotter=plt, color="black", ls=":", marker="o", end_message=None):
+    @profiled("Space.plot")
+    def plot(self, plotter=None, color="black", ls=":", marker="o", end_message=None):
+        plotter = plotter if plotter is not None else get_pyplot()
         for vector in self.voltage_vectors:
             vector.plot(plotter=plotter, color=color, ls=ls, marker=marker, end_message=end_message)
         self.A.plot(plotter, color, marker)
 
 
 class Sector(Space):
-    zero = PointFromNumber(0)
 
     def __init__(self, p1, p2, p3, p4, p5):
-        z = self.zero
+        z = base_points()[0]
         super().__init__(z, p5, p3)
         self.sub_sectors = [Space(z, p2, p1), Space(p2, p3, p4), Space(p1, p2, p4), Space(p1, p4, p5)]
 
-    def plot(self, plotter=plt, color="black", ls=":", marker="o", end_message=None):
+    @profiled("Sector.plot")
+    def plot(self, plotter=None, color="black", ls=":", marker="o", end_message=None):
+        plotter = plotter if plotter is not None else get_pyplot()
         for sector in self.sub_sectors:
             sector.plot(plotter, color, ls, marker, end_message)
 
+    @profiled("Sector.find_components")
     def find_components(self, point: Point) -> Optional[Tuple[float, float, Space]]:
+        count("points")
         t1, t2 = self.calculate_components(point)
         if t1 > 1 or t2 > 1 or t1 < 0 or t2 < 0:
+            count("outside")
             return None
         for sub_sector in self.sub_sectors:
             t1, t2 = sub_sector.calculate_components(point)
             if t1 + t2 > 1 or t1 < 0 or t2 < 0:
                 continue
             return t1, t2, sub_sector
+        count("outside")
+        return None
+
+    @profiled("Sector.find_components_batch")
+    def find_components_batch(self, points: np.array, tolerance: float = 0.0) \
+            -> Tuple[np.array, np.array, np.array, np.array]:
+        """
+        Vectorized find_components for an (N, 2) array of alpha/beta points.
+
+        :param tolerance: slack allowed on the boundaries, the returned components are clipped to stay non-negative
+        :return: sub sector index (-1 when not found), t1, t2 and the outside mask
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        sub_sector_index = np.full(len(points), -1, dtype=np.int8)
+        t1 = np.zeros(len(points))
+        t2 = np.zeros(len(points))
+
+        components = self.calculate_components_batch(points)
+        pending = np.all((components >= -tolerance) & (components <= 1 + tolerance), axis=1)
+        for index, sub_sector in enumerate(self.sub_sectors):
+            candidates = np.flatnonzero(pending)
+            if candidates.size == 0:
+                break
+            u, v = sub_sector.calculate_components_batch(points[candidates]).transpose()
+            inside = (u + v <= 1 + tolerance) & (u >= -tolerance) & (v >= -tolerance)
+            found = candidates[inside]
+            sub_sector_index[found] = index
+            t1[found] = u[inside]
+            t2[found] = v[inside]
+            pending[found] = False
+        if tolerance > 0:
+            np.maximum(t1, 0, out=t1)
+            np.maximum(t2, 0, out=t2)
+        if profiling.enabled:
+            count("points", len(points))
+            count("outside", np.count_nonzero(sub_sector_index < 0))
+        return sub_sector_index, t1, t2, sub_sector_index < 0
 
 
 def check_in_sector(sub_sector: Sector, point_to_test: Point):
@@ -73,7 +141,28 @@ def check_in_sector(sub_sector: Sector, point_to_test: Point):
     found.end.plot(color="blue", point_message=f"({found.end.alpha:0.2f},{found.end.beta:0.2f})\nv1:{u:0.3f} v2:{v:0.3f}")
 
 
+def decompose_in_sector(sector: Sector, points: PointSet) -> Tuple[VectorSet, VectorSet, np.array]:
+    """
+    Array version of the decomposition drawn by check_in_sector.
+
+    :return: first voltage vector components, second components chained to their ends, for the points inside,
+     and the outside mask of all the points
+    """
+    sub_sector, t1, t2, outside = sector.find_components_batch(points.to_array())
+    inside = ~outside
+    index = sub_sector[inside]
+    origins = np.array([[space.A.alpha, space.A.beta] for space in sector.sub_sectors])[index]
+    first = np.array([space.voltage_vectors[0].to_array().ravel() for space in sector.sub_sectors])[index]
+    second = np.array([space.voltage_vectors[1].to_array().ravel() for space in sector.sub_sectors])[index]
+
+    u_component = VectorSet.from_deltas(PointSet(origins[:, 0], origins[:, 1]), *(first * t1[inside, None]).T)
+    v_component = VectorSet.from_deltas(u_component.end, *(second * t2[inside, None]).T)
+    return u_component, v_component, outside
+
+
 if __name__ == "__main__":
+    plt = get_pyplot()
+    point0, point1, point2, point3, point4, point5 = base_points()
     sub_sector_test = Sector(point1, point2, point3, point4, point5)
     sub_sector_test.plot()
 
@@ -0,0 +1,182 @@
+"""
+Precomputed dwell times of the canonical sector, for replaying references without solving them.
+
+The table samples the 0 to 60 degrees sector of the dual inverter hexagon on a square alpha/beta grid and keeps,
+per node, the sub sector (uint8, 255 outside) and t1/t2 (float32). References of any sector are rotated into the
+canonical one by HexagonSVM.locate and read back by nearest node or bilinear interpolation. Dwell times are affine
+inside a sub sector, so bilinear interpolation is exact (up to float32) wherever the four corners share a sub
+sector; the remaining cells, along the sub sector edges, fall back to the nearest node.
+
+Tables are saved in one binary file: magic, header length, JSON header, then the three arrays, each 64 bytes
+aligned, opened back with np.memmap.
+"""
+import json
+import os
+import pathlib
+import struct
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from dual_svm_time_calculation import Sector
+from hexagon_svm import HexagonSVM
+
+table_magic = b"SVMDWT01"
+table_alignment = 64
+outside_index = 255
+methods = ("nearest", "bilinear")
+# name, dtype of the stored arrays, in file order
+table_arrays = (("sub_sector", np.dtype("u1")), ("t1", np.dtype("<f4")), ("t2", np.dtype("<f4")))
+
+
+def _aligned(size: int) -> int:
+    return -(-size // table_alignment) * table_alignment
+
+
+class DwellTable:
+    def __init__(self, step: float, sub_sector: np.array, t1: np.array, t2: np.array,
+                 engine: Optional[HexagonSVM] = None):
+        self.step = step
+        self.sub_sector = sub_sector
+        self.t1 = t1
+        self.t2 = t2
+        self.engine = engine if engine is not None else HexagonSVM()
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.sub_sector.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.sub_sector.nbytes + self.t1.nbytes + self.t2.nbytes
+
+    @classmethod
+    def build(cls, step: float = 2e-3, engine: Optional[HexagonSVM] = None) -> "DwellTable":
+        """ Solves every grid node of the bounding box of the canonical sector. """
+        engine = engine if engine is not None else HexagonSVM()
+        sector: Sector = engine.sector
+        vertices = np.array([[point.alpha, point.beta] for point in (sector.A, sector.B, sector.C)])
+        upper = vertices.max(axis=0)
+        alpha = np.arange(int(np.ceil(upper[0] / step)) + 2) * step
+        beta = np.arange(int(np.ceil(upper[1] / step)) + 2) * step
+
+        sub_sector = np.empty((len(alpha), len(beta)), dtype=np.uint8)
+        t1 = np.empty(sub_sector.shape, dtype=np.float32)
+        t2 = np.empty(sub_sector.shape, dtype=np.float32)
+        for row, value in enumerate(alpha):
+            points = np.stack((np.full(len(beta), value), beta), axis=1)
+            index, t1[row], t2[row], outside = sector.find_components_batch(points, tolerance=engine.tolerance)
+            sub_sector[row] = np.where(outside, outside_index, index)
+        return cls(step, sub_sector, t1, t2, engine)
+
+    def save(self, path: Union[str, pathlib.Path]) -> pathlib.Path:
+        path = pathlib.Path(path)
+        header = json.dumps({"step": self.step, "shape": list(self.shape),
+                             "arrays": [[name, dtype.str] for name, dtype in table_arrays]}).encode()
+        # Per process name, so workers saving the same table do not write into each other's file
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with temporary.open("wb") as table:
+            table.write(table_magic + struct.pack("<Q", len(header)) + header)
+            for name, dtype in table_arrays:
+                table.write(b"\0" * (_aligned(table.tell()) - table.tell()))
+                table.write(np.ascontiguousarray(getattr(self, name), dtype=dtype).tobytes())
+        os.replace(temporary, path)
+        return path
+
+    @classmethod
+    def open(cls, path: Union[str, pathlib.Path], engine: Optional[HexagonSVM] = None) -> "DwellTable":
+        path = pathlib.Path(path)
+        with path.open("rb") as table:
+            if table.read(len(table_magic)) != table_magic:
+                raise ValueError(f"{path} is not a dwell time table")
+            header_length, = struct.unpack("<Q", table.read(8))
+            header = json.loads(table.read(header_length))
+
+        shape = tuple(header["shape"])
+        offset = len(table_magic) + 8 + header_length
+        arrays = {}
+        for name, dtype in header["arrays"]:
+            offset = _aligned(offset)
+            arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+            offset += arrays[name].nbytes
+        return cls(header["step"], arrays["sub_sector"], arrays["t1"], arrays["t2"], engine)
+
+    def lookup(self, points: np.array, method: str = "bilinear") \
+            -> Tuple[np.array, np.array, np.array, np.array, np.array]:
+        """
+        Drop-in replacement of HexagonSVM.solve for (N, 2) alpha/beta points.
+
+        :return: sector, sub sector index (-1 when outside), t1, t2 and the outside mask
+        """
+        if method not in methods:
+            raise ValueError(f"Unknown interpolation {method}, expected one of {methods}")
+        sector, rotated = self.engine.locate(points)
+        rows, columns = self.shape
+        position = rotated / self.step
+        np.clip(position[:, 0], 0, rows - 1, out=position[:, 0])
+        np.clip(position[:, 1], 0, columns - 1, out=position[:, 1])
+        sub_sectors, t1_table, t2_table = (table.reshape(-1) for table in (self.sub_sector, self.t1, self.t2))
+
+        nearest = np.rint(position).astype(np.intp)
+        nearest = nearest[:, 0] * columns + nearest[:, 1]
+        found = sub_sectors[nearest]
+        t1 = t1_table[nearest].astype(float)
+        t2 = t2_table[nearest].astype(float)
+
+        if method == "bilinear":
+            low = np.floor(position).astype(np.intp)
+            np.minimum(low[:, 0], rows - 2, out=low[:, 0])
+            np.minimum(low[:, 1], columns - 2, out=low[:, 1])
+            weight = position - low
+            # Flat indices of the corners (0, 0), (0, 1), (1, 0), (1, 1)
+            corner = low[:, 0] * columns + low[:, 1]
+            corners = (corner, corner + 1, corner + columns, corner + columns + 1)
+            first = sub_sectors[corner]
+            shared = first != outside_index
+            for other in corners[1:]:
+                shared &= sub_sectors[other] == first
+            index = np.flatnonzero(shared)
+            weight = weight[index]
+            corners = [value[index] for value in corners]
+            weights = ((1 - weight[:, 0]) * (1 - weight[:, 1]), (1 - weight[:, 0]) * weight[:, 1],
+                       weight[:, 0] * (1 - weight[:, 1]), weight[:, 0] * weight[:, 1])
+            for values, table in ((t1, t1_table), (t2, t2_table)):
+                values[index] = sum(part * table[value] for part, value in zip(weights, corners))
+            found[index] = first[index]
+
+        outside = found == outside_index
+        sub_sector = np.where(outside, -1, found).astype(np.int8)
+        t1[outside] = 0
+        t2[outside] = 0
+        return sector, sub_sector, t1, t2, outside
+
+    def nearest_bound(self) -> float:
+        """ Largest t1/t2 error of a nearest lookup inside a sub sector: a node is at most step / sqrt(2) away. """
+        # t1 and t2 move by the displacement times a column of the inverse of the sub sector
+        norms = [np.linalg.norm(space.inverse_transposed, axis=0).max() for space in self.engine.sector.sub_sectors]
+        return float(max(norms) * self.step / np.sqrt(2))
+
+
+def error_report(table: DwellTable, points: np.array = None, samples: int = 100_000, seed: int = 0) \
+        -> Dict[str, Dict[str, float]]:
+    """
+    Errors of both lookup methods against the exact find_components result (solved in bulk by HexagonSVM.solve),
+    over the given points or uniform random references of the hexagon.
+    """
+    if points is None:
+        radius = 2 * np.sqrt(2 / 3)
+        points = np.random.default_rng(seed).uniform(-radius, radius, (samples, 2))
+    _, exact_sub_sector, exact_t1, exact_t2, exact_outside = table.engine.solve(points)
+    report = {}
+    for method in methods:
+        _, sub_sector, t1, t2, outside = table.lookup(points, method)
+        # Dwell times of different sub sectors are not comparable, those points only count as mismatches
+        both_inside = ~outside & ~exact_outside
+        matching = both_inside & (sub_sector == exact_sub_sector)
+        error = np.maximum(np.abs(t1 - exact_t1), np.abs(t2 - exact_t2))[matching]
+        report[method] = {"max_error": float(error.max()) if error.size else 0.0,
+                          "mean_error": float(error.mean()) if error.size else 0.0,
+                          "sub_sector_mismatch": float(np.count_nonzero(both_inside & ~matching) / len(points)),
+                          "outside_mismatch": float(np.mean(outside != exact_outside))}
+    report["nearest_bound"] = {"max_error": table.nearest_bound()}
+    return report
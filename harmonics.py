@@ -0,0 +1,134 @@
+"""
+Harmonic spectrum, THD and WTHD of sampled PWM waveforms.
+
+The spectrum is averaged (Welch style) over segments holding a whole number of fundamental periods, so harmonic
+n always falls on bin n * periods and a rectangular window leaks nothing. The sample rate must therefore be a whole
+multiple of fundamental / periods. A (periodic) Hann window spreads every harmonic over its two neighbouring bins,
+so it needs at least two periods per segment to keep them off the next harmonic. Samples are consumed chunk by chunk and
+only the unfinished segment is kept between chunks, so traces larger than memory can be analyzed from the
+*_sampling_chunks generators.
+"""
+from numbers import Number
+from typing import Iterable, Iterator, Tuple
+
+import numpy as np
+
+windows = ("rectangular", "hann")
+
+
+class SpectrumAccumulator:
+    def __init__(self, sample_rate: float, fundamental: float, periods: int = 1, window: str = "rectangular"):
+        if window not in windows:
+            raise ValueError(f"Unknown window {window}, expected one of {windows}")
+        self.sample_rate = sample_rate
+        self.fundamental = fundamental
+        self.periods = periods
+        length = periods * sample_rate / fundamental
+        self.segment_length = int(round(length))
+        if self.segment_length < 2:
+            raise ValueError(f"{periods} periods of {fundamental} Hz are less than two samples at {sample_rate} Hz")
+        if abs(length - self.segment_length) > 1e-9 * length:
+            raise ValueError(f"{periods} periods of {fundamental} Hz are not a whole number of samples at "
+                             f"{sample_rate} Hz ({length}), the harmonics would leak")
+        if window == "hann":
+            if periods < 2:
+                raise ValueError("A hann window needs periods >= 2, harmonics one bin apart leak into each other")
+            # Periodic Hann: zero leakage beyond the neighbouring bins of a harmonic
+            self.window = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(self.segment_length) / self.segment_length)
+        else:
+            self.window = np.ones(self.segment_length)
+        # Amplitude scaling: peak of a sinusoid on its bin, the DC and Nyquist bins are not doubled
+        self.scale = np.full(self.segment_length // 2 + 1, 2 / self.window.sum())
+        self.scale[0] /= 2
+        if self.segment_length % 2 == 0:
+            self.scale[-1] /= 2
+        self.power = np.zeros(self.segment_length // 2 + 1)
+        self.segments = 0
+        self.pending = np.empty(0)
+
+    def add(self, chunk) -> "SpectrumAccumulator":
+        samples = np.concatenate((self.pending, np.asarray(chunk, dtype=float).ravel()))
+        complete = len(samples) // self.segment_length
+        if complete:
+            segments = samples[:complete * self.segment_length].reshape(complete, self.segment_length)
+            amplitudes = np.abs(np.fft.rfft(segments * self.window, axis=1)) * self.scale
+            self.power += np.square(amplitudes).sum(axis=0)
+            self.segments += complete
+        self.pending = samples[complete * self.segment_length:].copy()
+        return self
+
+    def add_chunks(self, chunks: Iterable) -> "SpectrumAccumulator":
+        for chunk in chunks:
+            self.add(chunk)
+        return self
+
+    @property
+    def frequencies(self) -> np.array:
+        return np.fft.rfftfreq(self.segment_length, 1 / self.sample_rate)
+
+    @property
+    def amplitudes(self) -> np.array:
+        """ Peak amplitude of every bin, root mean square over the segments. """
+        if self.segments == 0:
+            raise ValueError(f"Not a single complete segment of {self.segment_length} samples was added")
+        return np.sqrt(self.power / self.segments)
+
+    @property
+    def max_order(self) -> int:
+        return (len(self.power) - 1) // self.periods
+
+    def harmonics(self, max_order: int = None) -> np.array:
+        """ Amplitudes of the harmonics 0 (DC) to max_order of the fundamental. """
+        max_order = self.max_order if max_order is None else min(max_order, self.max_order)
+        return self.amplitudes[np.arange(max_order + 1) * self.periods]
+
+    def thd(self, max_order: int = None) -> float:
+        harmonics = self.harmonics(max_order)
+        return float(np.sqrt(np.sum(np.square(harmonics[2:]))) / harmonics[1])
+
+    def wthd(self, max_order: int = None) -> float:
+        """ THD with every harmonic divided by its order, closer to the resulting current distortion. """
+        harmonics = self.harmonics(max_order)
+        orders = np.arange(len(harmonics))
+        return float(np.sqrt(np.sum(np.square(harmonics[2:] / orders[2:]))) / harmonics[1])
+
+
+def _chunks(source, component: int = 0) -> Iterator[np.array]:
+    """
+    Accepts an array, a list of samples, the (output, sampled) tuple of the sampling functions, or an iterable of
+    chunks, each one possibly an (output, sampled) tuple. component picks the element of those tuples.
+    """
+    if isinstance(source, np.ndarray):
+        yield source
+        return
+    if isinstance(source, tuple):
+        source = source[component]
+    if isinstance(source, (list, np.ndarray)) and (len(source) == 0 or isinstance(source[0], Number)):
+        yield np.asarray(source, dtype=float)
+        return
+    for chunk in source:
+        yield chunk[component] if isinstance(chunk, tuple) else chunk
+
+
+def harmonic_analysis(source, sample_rate: float, fundamental: float, periods: int = 1,
+                      window: str = "rectangular", component: int = 0) -> SpectrumAccumulator:
+    """
+    Spectrum of a waveform given as an array or as chunks (see _chunks).
+
+    :param periods: fundamental periods per segment, more periods resolve inter-harmonics but average less
+    """
+    return SpectrumAccumulator(sample_rate, fundamental, periods, window).add_chunks(_chunks(source, component))
+
+
+def spectrum(source, sample_rate: float, fundamental: float, **kwargs) -> Tuple[np.array, np.array]:
+    """ Frequencies and peak amplitudes. """
+    accumulated = harmonic_analysis(source, sample_rate, fundamental, **kwargs)
+    return accumulated.frequencies, accumulated.amplitudes
+
+
+def thd(source, sample_rate: float, fundamental: float, max_order: int = None, **kwargs) -> float:
+    return harmonic_analysis(source, sample_rate, fundamental, **kwargs).thd(max_order)
+
+
+def wthd(source, sample_rate: float, fundamental: float, max_order: int = None, **kwargs) -> float:
+    return harmonic_analysis(source, sample_rate, fundamental, **kwargs).wthd(max_order)
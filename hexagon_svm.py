@@ -0,0 +1,72 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+from dual_svm_time_calculation import Sector, base_sector
+from profiling import profiled
+from sector_symmetry import Point
+from switching_states import GROUPS, GROUP_ROTATION, REDUNDANCY_GROUP, STATE_ROTATION
+
+sector_count = 6
+sector_angle = np.pi / 3
+
+
+class HexagonSVM:
+    """
+    Dwell time solver for the whole dual inverter hexagon.
+
+    Only the canonical sector (0 to 60 degrees) is kept as a Sector. A reference is rotated into it by the
+    sector found from its angle, solved there, and the resulting states are rotated back with the state
+    symmetry tables.
+    """
+
+    def __init__(self, sector: Optional[Sector] = None, tolerance: float = 1e-9):
+        if sector is None:
+            sector = base_sector()
+        self.sector = sector
+        self.tolerance = tolerance
+        angles = -sector_angle * np.arange(sector_count)
+        self.cos, self.sin = np.cos(angles), np.sin(angles)
+
+        base_groups = np.array([[REDUNDANCY_GROUP[vertex.voltage_numbers[0]]
+                                 for vertex in (space.A, space.B, space.C)] for space in sector.sub_sectors])
+        # vertex_groups[sector, sub sector, vertex] -> redundancy group of the vertex in that sector
+        self.vertex_groups = GROUP_ROTATION[:, base_groups]
+
+    def locate(self, points: np.array) -> Tuple[np.array, np.array]:
+        """ Sector of each (N, 2) alpha/beta point and the point rotated into the canonical sector. """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        alpha, beta = points[:, 0], points[:, 1]
+        sector = np.floor(np.arctan2(beta, alpha) / sector_angle).astype(np.int64) % sector_count
+        cos, sin = self.cos[sector], self.sin[sector]
+        rotated = np.empty_like(points)
+        rotated[:, 0] = cos * alpha - sin * beta
+        rotated[:, 1] = sin * alpha + cos * beta
+        return sector, rotated
+
+    @profiled("HexagonSVM.solve")
+    def solve(self, points: np.array) -> Tuple[np.array, np.array, np.array, np.array, np.array]:
+        """
+        :return: sector, sub sector index (-1 when outside), t1, t2 and the outside mask
+        """
+        sector, rotated = self.locate(points)
+        sub_sector, t1, t2, outside = self.sector.find_components_batch(rotated, tolerance=self.tolerance)
+        return sector, sub_sector, t1, t2, outside
+
+    def find_components(self, point: Point) -> Optional[Tuple[int, int, float, float]]:
+        sector, sub_sector, t1, t2, outside = self.solve(np.array([point.alpha, point.beta]))
+        if outside[0]:
+            return None
+        return int(sector[0]), int(sub_sector[0]), float(t1[0]), float(t2[0])
+
+    def groups(self, sector: np.array, sub_sector: np.array) -> np.array:
+        """ (N, 3) redundancy groups of the A, B and C vertices, only meaningful where sub_sector >= 0. """
+        return self.vertex_groups[sector, np.maximum(sub_sector, 0)]
+
+    def vertex_states(self, sector: int, sub_sector: int) -> Tuple[Tuple[int, ...], ...]:
+        return tuple(GROUPS[group] for group in self.vertex_groups[sector, sub_sector])
+
+    @staticmethod
+    def rotate_states(sector: np.array, base_states: np.array) -> np.array:
+        """ Maps state numbers chosen in the canonical sector back to the given sectors. """
+        return STATE_ROTATION[sector, base_states]
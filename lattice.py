@@ -0,0 +1,120 @@
+"""
+Space vectors as integer coordinates on the hexagonal lattice.
+
+A vector is m * a + n * b, with a at 0 degrees and b at 60 degrees, both sqrt(2/3) long (one dc voltage step
+of the power invariant Clarke transformation). From the pole differences du, dv, dw of a state, m = du - dv and
+n = dv - dw, so every state of the dual two-level inverter has small integer coordinates: grouping, symmetries and
+sector classification become exact integer operations and (m, n) tuples are exact dict keys.
+"""
+from fractions import Fraction
+from typing import Tuple
+
+import numpy as np
+
+# The per state lattice tables are built in switching_states, with the other per state tables, and re-exported here
+from switching_states import LATTICE_STATES, LATTICE_TUPLES, STATE_LATTICE
+
+__all__ = ["unit", "sector_count", "from_differences", "to_alpha_beta", "to_lattice", "nearest", "rotate", "negate",
+           "sector", "canonical", "sub_sector", "phase_voltages", "alpha_beta_str", "states_at", "STATE_LATTICE",
+           "LATTICE_TUPLES", "LATTICE_STATES"]
+
+unit = np.sqrt(2 / 3)
+sector_count = 6
+
+
+def from_differences(differences: np.array, scale: int = 1) -> np.array:
+    """ (N, 2) lattice coordinates of (N, 3) pole differences, multiples of 1 / scale (levels - 1). """
+    differences = np.rint(np.asarray(differences) * scale).astype(np.int64)
+    return np.stack((differences[..., 0] - differences[..., 1], differences[..., 1] - differences[..., 2]), axis=-1)
+
+
+def to_alpha_beta(lattice: np.array, scale: int = 1) -> np.array:
+    lattice = np.asarray(lattice)
+    m, n = lattice[..., 0] / scale, lattice[..., 1] / scale
+    return np.stack((unit * (m + n / 2), unit * np.sqrt(3) / 2 * n), axis=-1)
+
+
+def to_lattice(alpha_beta: np.array, scale: int = 1) -> np.array:
+    """ Real valued lattice coordinates of alpha/beta points, in units of 1 / scale. """
+    alpha_beta = np.asarray(alpha_beta, dtype=float)
+    n = alpha_beta[..., 1] * np.sqrt(2)
+    m = alpha_beta[..., 0] / unit - n / 2
+    return np.stack((m, n), axis=-1) * scale
+
+
+def nearest(alpha_beta: np.array, scale: int = 1) -> np.array:
+    """ Integer coordinates of points known to lie on the lattice, rounding away float noise. """
+    return np.rint(to_lattice(alpha_beta, scale)).astype(np.int64)
+
+
+def rotate(lattice: np.array, steps=1) -> np.array:
+    """ Rotation by steps * 60 degrees, (m, n) -> (-n, m + n) per step. """
+    lattice = np.asarray(lattice)
+    m, n = lattice[..., 0], lattice[..., 1]
+    steps = np.asarray(steps) % sector_count
+    # The six rotations as integer matrices applied to (m, n)
+    rotated_m = np.choose(steps, (m, -n, -m - n, -m, n, m + n))
+    rotated_n = np.choose(steps, (n, m + n, m, -n, -m - n, -m))
+    return np.stack((rotated_m, rotated_n), axis=-1)
+
+
+def negate(lattice: np.array) -> np.array:
+    return -np.asarray(lattice)
+
+
+def sector(lattice: np.array) -> np.array:
+    """ 60 degrees sector of every point, sector k spans [k * 60, (k + 1) * 60), the origin is in sector 0. """
+    lattice = np.asarray(lattice)
+    m, n = lattice[..., 0], lattice[..., 1]
+    conditions = ((m > 0) & (n >= 0), (m <= 0) & (m + n > 0), (n > 0) & (m + n <= 0),
+                  (m < 0) & (n <= 0), (m >= 0) & (m + n < 0), (n < 0) & (m + n >= 0))
+    return np.select(conditions, np.arange(sector_count), 0)
+
+
+def canonical(lattice: np.array) -> Tuple[np.array, np.array]:
+    """ Sector of every point and the point rotated into sector 0. """
+    found = sector(lattice)
+    return found, rotate(lattice, -found)
+
+
+def sub_sector(lattice: np.array, scale: int = 1) -> np.array:
+    """
+    Sub sector index of dual_svm_time_calculation.Sector for canonical points given in units of 1 / scale, -1
+    outside the hexagon. Edges are inclusive and the first sub sector wins, as in Sector.find_components_batch.
+    """
+    lattice = np.asarray(lattice, dtype=np.int64)
+    m, n = lattice[..., 0], lattice[..., 1]
+    total = m + n
+    inside = (m >= 0) & (n >= 0) & (total <= 2 * scale)
+    # Space(z, p2, p1), Space(p2, p3, p4), Space(p1, p2, p4), Space(p1, p4, p5)
+    conditions = (inside & (total <= scale), inside & (m >= scale), inside & (m <= scale) & (n <= scale),
+                  inside & (n >= scale))
+    return np.select(conditions, np.arange(4), -1)
+
+
+def phase_voltages(lattice) -> Tuple[Fraction, Fraction, Fraction]:
+    """ Exact u, v, w of a lattice point (u - v = m, v - w = n, u + v + w = 0). """
+    m, n = (int(value) for value in lattice)
+    return Fraction(2 * m + n, 3), Fraction(n - m, 3), Fraction(-m - 2 * n, 3)
+
+
+def _surd(numerator: int, radicand: int) -> str:
+    """ numerator * sqrt(radicand) / radicand, in lowest terms. """
+    value = Fraction(numerator, radicand)
+    if value == 0:
+        return "0"
+    sign = "-" if value < 0 else ""
+    value = abs(value)
+    coefficient = "" if value.numerator == 1 else str(value.numerator)
+    denominator = "" if value.denominator == 1 else f"/{value.denominator}"
+    return f"{sign}{coefficient}√{radicand}{denominator}"
+
+
+def alpha_beta_str(lattice) -> Tuple[str, str]:
+    """ Exact alpha = (2 m + n) / sqrt(6) and beta = n / sqrt(2) as strings. """
+    m, n = (int(value) for value in lattice)
+    return _surd(2 * m + n, 6), _surd(n, 2)
+
+
+def states_at(lattice) -> Tuple[int, ...]:
+    return LATTICE_STATES.get(tuple(int(value) for value in lattice), ())
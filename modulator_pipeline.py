@@ -0,0 +1,157 @@
+"""
+dq references to dual inverter phase voltages in one pass:
+
+    inverse Park -> alpha/beta (inverse Clarke for the reference phase voltages) -> HexagonSVM sector and dwell
+    times -> SwitchingSequenceGenerator states -> averaged and instantaneous phase voltages
+
+Every stage works on whole chunks of carrier periods. Operating points of a drive map are independent and are
+spread over a process pool with run_map.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from hexagon_svm import HexagonSVM
+from profiling import profiled
+from switching_sequence import SwitchingSequenceGenerator
+from switching_states import PHASE_VOLTAGES, TRANSITIONS
+from transformations.Clarke import inverse_clarke_matrix
+from transformations.batch import inv_park_batch
+
+
+class OperatingPoint(NamedTuple):
+    d: float
+    q: float
+    frequency: float
+    duration: float
+    phase: float = 0.0
+
+
+class ModulatorOutput(NamedTuple):
+    """ Per carrier period arrays have N rows, per sub-interval arrays 3 N rows. """
+    alpha_beta: np.array
+    reference: np.array
+    sector: np.array
+    sub_sector: np.array
+    t1: np.array
+    t2: np.array
+    outside: np.array
+    averaged: np.array
+    timestamps: np.array
+    states: np.array
+    instantaneous: np.array
+
+
+class OperatingResult(NamedTuple):
+    point: OperatingPoint
+    periods: int
+    outside: int
+    transitions: int
+    max_error: float
+    rms_error: float
+
+
+def reference_chunks(point: OperatingPoint, period: float, chunk_size: int) -> Iterator[Tuple[np.array, np.array]]:
+    """ (theta, (3, n) dq) of an operating point, one reference per carrier period. """
+    total = int(round(point.duration / period))
+    for start in range(0, total, chunk_size):
+        index = np.arange(start, min(start + chunk_size, total))
+        theta = 2 * np.pi * point.frequency * period * index + point.phase
+        dq = np.zeros((3, len(index)))
+        dq[0], dq[1] = point.d, point.q
+        yield theta, dq
+
+
+class ModulatorPipeline:
+    def __init__(self, period: float, engine: Optional[HexagonSVM] = None, chunk_size: int = 2 ** 16,
+                 initial_state: int = 0):
+        self.period = period
+        self.chunk_size = chunk_size
+        self.engine = engine if engine is not None else HexagonSVM()
+        self.generator = SwitchingSequenceGenerator(period, self.engine, initial_state)
+
+    def reset(self, initial_state: int = 0, start_time: float = 0.0):
+        self.generator.state = initial_state
+        self.generator.time = start_time
+
+    @profiled("ModulatorPipeline.process")
+    def process(self, theta, dq: np.array) -> ModulatorOutput:
+        """
+        :param theta: angle of every carrier period
+        :param dq: (3, N) or (2, N) dq(0) references, in the per unit of switching_states.ALPHA_BETA
+        """
+        dq = np.asarray(dq, dtype=float)
+        if dq.shape[0] == 2:
+            dq = np.vstack((dq, np.zeros((1, dq.shape[1]))))
+        alpha_beta_gamma = inv_park_batch(theta, dq)
+        reference = np.matmul(inverse_clarke_matrix, alpha_beta_gamma).transpose()
+        alpha_beta = alpha_beta_gamma[:2].transpose()
+
+        sector, sub_sector, t1, t2, outside = self.engine.solve(alpha_beta)
+        timestamps, states = self.generator.generate(sector, sub_sector, t1, t2)
+
+        durations = np.diff(timestamps, append=self.generator.time) if len(timestamps) else np.empty(0)
+        instantaneous = PHASE_VOLTAGES[states]
+        averaged = (instantaneous * durations[:, None]).reshape(-1, 3, 3).sum(axis=1) / self.period
+        return ModulatorOutput(alpha_beta, reference, sector, sub_sector, t1, t2, outside, averaged, timestamps,
+                               states, instantaneous)
+
+    def process_trajectory(self, theta, dq: np.array) -> Iterator[ModulatorOutput]:
+        """ A whole reference trajectory, processed chunk_size periods at a time. """
+        theta = np.broadcast_to(np.asarray(theta, dtype=float), np.shape(dq)[1:])
+        for start in range(0, len(theta), self.chunk_size):
+            yield self.process(theta[start:start + self.chunk_size], dq[:, start:start + self.chunk_size])
+
+    def process_chunks(self, chunks: Iterable[Tuple[np.array, np.array]]) -> Iterator[ModulatorOutput]:
+        for theta, dq in chunks:
+            yield self.process(theta, dq)
+
+    def run(self, point: OperatingPoint) -> OperatingResult:
+        """ Streams an operating point and keeps only its summary. """
+        self.reset()
+        periods = outside = transitions = 0
+        max_error = squared_error = 0.0
+        previous = self.generator.state
+        for output in self.process_chunks(reference_chunks(point, self.period, self.chunk_size)):
+            inside = ~output.outside
+            error = np.abs(output.averaged[inside] - output.reference[inside])
+            periods += len(output.outside)
+            outside += int(np.count_nonzero(output.outside))
+            states = np.concatenate(([previous], output.states))
+            transitions += int(TRANSITIONS[states[:-1], states[1:]].sum())
+            previous = int(states[-1])
+            if error.size:
+                max_error = max(max_error, float(error.max()))
+                squared_error += float(np.square(error).sum())
+        compared = 3 * (periods - outside)
+        return OperatingResult(point, periods, outside, transitions, max_error,
+                               float(np.sqrt(squared_error / compared)) if compared else 0.0)
+
+
+_worker_pipeline: Optional[ModulatorPipeline] = None
+
+
+def _set_worker_pipeline(period: float, chunk_size: int):
+    global _worker_pipeline
+    _worker_pipeline = ModulatorPipeline(period, chunk_size=chunk_size)
+
+
+def _worker_run(point: OperatingPoint) -> OperatingResult:
+    return _worker_pipeline.run(point)
+
+
+def run_map(points: Sequence[OperatingPoint], period: float, workers: int = None, chunk_size: int = 2 ** 16) \
+        -> List[OperatingResult]:
+    """
+    Summaries of independent operating points, in the order given.
+
+    :param workers: spread the points over this many processes when larger than 1, every process builds its
+     pipeline once
+    """
+    if workers is not None and workers > 1 and len(points) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_set_worker_pipeline,
+                                 initargs=(period, chunk_size)) as executor:
+            return list(executor.map(_worker_run, points))
+    pipeline = ModulatorPipeline(period, chunk_size=chunk_size)
+    return [pipeline.run(point) for point in points]
@@ -0,0 +1,148 @@
+"""
+Named timers and counters around the stages of the analysis.
+
+Nothing is recorded until enable() is called; while disabled a profiled function only pays one flag check.
+Timers nest, so the same stage called from two places shows up under both callers.
+
+    import profiling
+    profiling.enable()
+    ...
+    profiling.write_json("profile.json")
+    profiling.write_folded("profile.folded")  # flamegraph.pl / speedscope input
+"""
+import functools
+import json
+import pathlib
+import time
+from contextlib import contextmanager
+from typing import Dict, Union
+
+enabled = False
+
+
+class Stage:
+    __slots__ = ("name", "calls", "seconds", "counters", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.counters: Dict[str, int] = {}
+        self.children: Dict[str, "Stage"] = {}
+
+    def child(self, name: str) -> "Stage":
+        stage = self.children.get(name)
+        if stage is None:
+            stage = self.children[name] = Stage(name)
+        return stage
+
+    @property
+    def self_seconds(self) -> float:
+        return self.seconds - sum(child.seconds for child in self.children.values())
+
+    def to_dict(self) -> Dict:
+        return {"name": self.name, "calls": self.calls, "seconds": self.seconds, "self_seconds": self.self_seconds,
+                "counters": dict(self.counters), "children": [child.to_dict() for child in self.children.values()]}
+
+
+root = Stage("root")
+_stack = [root]
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    global root
+    root = Stage("root")
+    _stack[:] = [root]
+
+
+@contextmanager
+def timer(name: str):
+    if not enabled:
+        yield
+        return
+    stage = _stack[-1].child(name)
+    _stack.append(stage)
+    start = time.perf_counter()
+    try:
+        yield stage
+    finally:
+        stage.seconds += time.perf_counter() - start
+        stage.calls += 1
+        _stack.pop()
+
+
+def profiled(name: str = None):
+    """ Decorator timing every call of the function as the stage name (the function name by default). """
+
+    def decorate(function):
+        stage_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            with timer(stage_name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def count(name: str, value: int = 1):
+    """ Adds value to a counter of the innermost running stage. """
+    if enabled:
+        counters = _stack[-1].counters
+        counters[name] = counters.get(name, 0) + int(value)
+
+
+def totals(stage: Stage = None) -> Dict[str, int]:
+    """ Counters summed over a stage and everything below it. """
+    stage = stage if stage is not None else root
+    summed = dict(stage.counters)
+    for child in stage.children.values():
+        for key, value in totals(child).items():
+            summed[key] = summed.get(key, 0) + value
+    return summed
+
+
+def summary() -> Dict:
+    counters = totals()
+    if counters.get("points"):
+        counters["solves_per_point"] = counters.get("solves", 0) / counters["points"]
+    return {"seconds": sum(child.seconds for child in root.children.values()), "counters": counters,
+            "stages": [child.to_dict() for child in root.children.values()]}
+
+
+def folded() -> str:
+    """ One "stage;sub stage microseconds" line per stage with its self time, the collapsed flame graph format. """
+    lines = []
+
+    def walk(stage: Stage, path: str):
+        lines.append(f"{path} {max(int(round(stage.self_seconds * 1e6)), 0)}")
+        for child in stage.children.values():
+            walk(child, f"{path};{child.name}")
+
+    for stage in root.children.values():
+        walk(stage, stage.name)
+    return "\n".join(lines)
+
+
+def write_json(path: Union[str, pathlib.Path]):
+    pathlib.Path(path).write_text(json.dumps(summary(), indent=2))
+    return path
+
+
+def write_folded(path: Union[str, pathlib.Path]):
+    pathlib.Path(path).write_text(folded() + "\n")
+    return path
@@ -0,0 +1,107 @@
+import pathlib
+from math import cos, sin, radians
+from typing import Iterable, List, Sequence, Tuple, Union
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+from profiling import profiled
+from sector_symmetry import PointSet, VectorSet
+
+
+class SpaceVectorDiagram:
+    """
+    Collects points, vectors and line segments and draws every group with a single artist.
+
+    Figures are created without pyplot on the Agg canvas, so diagrams render straight to PNG/SVG files on
+    headless workers and no window is ever opened.
+    """
+
+    def __init__(self, limits: Tuple[float, float] = (-1.75, 1.75), size: Tuple[float, float] = (8, 8),
+                 dpi: int = 100):
+        self.limits = limits
+        self.size = size
+        self.dpi = dpi
+        self.point_groups = []
+        self.vector_groups = []
+        self.line_groups = []
+        self.labels = []
+
+    def add_points(self, points: PointSet, color="black", marker="o", size: float = 20, labels: Sequence = None):
+        self.point_groups.append((points.alpha, points.beta, color, marker, size))
+        if labels is not None:
+            self.labels.extend(zip(points.alpha, points.beta, labels))
+        return self
+
+    def add_vectors(self, vectors: VectorSet, color="black"):
+        self.vector_groups.append((vectors.origin.alpha, vectors.origin.beta, vectors.delta_alpha,
+                                   vectors.delta_beta, color))
+        return self
+
+    def add_segments(self, segments: np.array, color="black", linestyle=":"):
+        """ segments: (N, 2, 2) array of [[alpha0, beta0], [alpha1, beta1]]. """
+        self.line_groups.append((np.asarray(segments, dtype=float).reshape(-1, 2, 2), color, linestyle))
+        return self
+
+    def add_spaces(self, spaces: Iterable, color="black", linestyle=":", marker="o"):
+        """ Voltage vectors and vertices of dual_svm_time_calculation.Space objects. """
+        segments, vertices = [], []
+        for space in spaces:
+            for vector in space.voltage_vectors:
+                segments.append(((vector.origin.alpha, vector.origin.beta), (vector.end.alpha, vector.end.beta)))
+            vertices.extend((space.A, space.B, space.C))
+        self.add_segments(np.array(segments), color, linestyle)
+        return self.add_points(PointSet.from_points(vertices), color, marker)
+
+    def add_sector_lines(self, origins: Sequence[Tuple[float, float]] = ((0, 0),), length: float = 1.0,
+                         color="black", linestyle="dashed"):
+        """ The six 60 degrees sector boundaries around every origin, as in draw_sectors. """
+        directions = np.array([(cos(radians(i * 60)), sin(radians(i * 60))) for i in range(6)]) * length
+        origins = np.asarray(origins, dtype=float).reshape(-1, 1, 2)
+        segments = np.stack(np.broadcast_arrays(origins, origins + directions[None]), axis=2)
+        return self.add_segments(segments.reshape(-1, 2, 2), color, linestyle)
+
+    @profiled("SpaceVectorDiagram.render")
+    def render(self) -> Figure:
+        figure = Figure(figsize=self.size, dpi=self.dpi)
+        FigureCanvasAgg(figure)
+        axes = figure.add_subplot()
+        axes.set_xlim(self.limits)
+        axes.set_ylim(self.limits)
+        axes.set_aspect("equal")
+        for segments, color, linestyle in self.line_groups:
+            axes.add_collection(LineCollection(segments, colors=color, linestyles=linestyle))
+        for alpha, beta, delta_alpha, delta_beta, color in self.vector_groups:
+            axes.quiver(alpha, beta, delta_alpha, delta_beta, color=color, angles="xy", scale_units="xy", scale=1,
+                        width=0.003)
+        for alpha, beta, color, marker, size in self.point_groups:
+            axes.scatter(alpha, beta, c=color, marker=marker, s=size)
+        for alpha, beta, label in self.labels:
+            axes.annotate(label, xy=(alpha, beta))
+        return figure
+
+    @profiled("SpaceVectorDiagram.save")
+    def save(self, path: Union[str, pathlib.Path], file_format: str = None):
+        figure = self.render()
+        figure.savefig(path, format=file_format)
+        return path
+
+
+def check_in_sector_diagram(sector, points: PointSet, diagram: SpaceVectorDiagram = None) -> SpaceVectorDiagram:
+    """ Batched counterpart of dual_svm_time_calculation.check_in_sector. """
+    from dual_svm_time_calculation import decompose_in_sector
+
+    diagram = diagram if diagram is not None else SpaceVectorDiagram()
+    diagram.add_spaces(sector.sub_sectors)
+    u_component, v_component, outside = decompose_in_sector(sector, points)
+    diagram.add_vectors(u_component, color="blue")
+    diagram.add_vectors(v_component, color="blue")
+    diagram.add_points(v_component.end, color="blue")
+    diagram.add_points(points[outside], color="red", marker="x")
+    return diagram
+
+
+def save_diagrams(diagrams: Iterable[Tuple[SpaceVectorDiagram, Union[str, pathlib.Path]]]) -> List:
+    return [diagram.save(path) for diagram, path in diagrams]
@@ -1,12 +1,16 @@
-from fractions import Fraction
 from functools import reduce
-from typing import List, Tuple, Union, Any
-from transformations.Clarke import clark
+from typing import Iterable, List, Tuple, Union, Any
+from lattice import LATTICE_TUPLES, alpha_beta_str, to_lattice
+from switching_states import ALPHA_BETA, PHASE_VOLTAGES, REDUNDANCY_GROUP, STATE_TUPLES, ZERO_SEQUENCE
 import numpy as np
-import matplotlib.pyplot as plt
 
-from voltages_calculator import to_binary_list, delta_voltage, delta_u, delta_v, delta_w, get_number_from_state, \
-    convert_number_to_convention
+from voltages_calculator import to_binary_list, get_number_from_state, convert_number_to_convention
+
+
+def get_pyplot():
+    """ matplotlib is only imported once something is plotted. """
+    import matplotlib.pyplot as plt
+    return plt
 
 
 def negate(or_state) -> Tuple[Union[int, Any], ...]:
@@ -14,28 +18,23 @@ def negate(or_state) -> Tuple[Union[int, Any], ...]:
 
 
 def get_uvw_from_state(state: Tuple[int, ...]):
-    u = [delta_u, delta_v, delta_w]
-    v = [delta_v, delta_u, delta_w]
-    w = [delta_w, delta_v, delta_u]
-
-    u = delta_voltage(state, u)
-    v = delta_voltage(state, v)
-    w = delta_voltage(state, w)
-    return u, v, w
+    return tuple(PHASE_VOLTAGES[get_number_from_state(state)].tolist())
 
 
 def load_and_compare(state: Tuple[int], saved_vectors: dict):
-    u, v, w = get_uvw_from_state(state)
-    al, bet, _ = clark(np.array([u, v, w]))
+    # Exact integer lattice coordinates, so the comparison does not depend on float rounding
+    m, n = LATTICE_TUPLES[get_number_from_state(state)]
 
     if not state[0] == 1:
-        saved_vectors[state] = tuple((al, bet))
+        saved_vectors[state] = (m, n)
     else:
         negated_state = tuple((1 - i for i in state))
-        assert saved_vectors[negated_state] == tuple((-al, -bet))
+        assert saved_vectors[negated_state] == (-m, -n)
 
 
 class Point:
+    __slots__ = ("alpha", "beta")
+
     def __init__(self, alpha: float, beta: float):
         self.alpha, self.beta = alpha, beta
 
@@ -45,13 +44,16 @@ class Point:
     def __str__(self):
         return f"Alpha: {self.alpha:0.3f}, Beta: {self.beta:0.3f}"
 
-    def plot(self, plotter=plt, color="black", marker="o", point_message=None):
+    def plot(self, plotter=None, color="black", marker="o", point_message=None):
+        plotter = plotter if plotter is not None else get_pyplot()
         plotter.plot(self.alpha, self.beta, marker=marker, color=color)
         if point_message:
             plotter.annotate(point_message, xy=(self.alpha, self.beta))
 
 
 class PointFromNumber(Point):
+    __slots__ = ("states", "voltage_numbers", "lattice")
+
     def __init__(self, voltage_numbers: Union[int, Tuple[int, ...]]):
         """
 
@@ -61,14 +63,19 @@ class PointFromNumber(Point):
         if isinstance(voltage_numbers, int):
             voltage_numbers = tuple([voltage_numbers])
 
-        self.states = [to_binary_list(voltage_number) for voltage_number in voltage_numbers]
+        self.states = [STATE_TUPLES[voltage_number] for voltage_number in voltage_numbers]
         self.voltage_numbers = voltage_numbers
 
-        for state in self.states:
-            assert get_uvw_from_state(self.states[0]) == get_uvw_from_state(state)
-        al, bet, _ = clark(np.array(get_uvw_from_state(self.states[0])))
+        assert len({REDUNDANCY_GROUP[voltage_number] for voltage_number in voltage_numbers}) == 1
+        al, bet = ALPHA_BETA[voltage_numbers[0]]
+        self.lattice = LATTICE_TUPLES[voltage_numbers[0]]
         super().__init__(al, bet)
 
+    @property
+    def zero_sequences(self) -> Tuple[float, ...]:
+        """ Gamma applied to the winding by each redundant state, alpha and beta being shared by all of them. """
+        return tuple(float(ZERO_SEQUENCE[number]) for number in self.voltage_numbers)
+
     def symmetric(self):
         negated_states = tuple(negate(state) for state in self.states)
         numbers = tuple(get_number_from_state(ns) for ns in negated_states)
@@ -92,14 +99,27 @@ class PointFromNumber(Point):
         return state_str
 
 
+def _exact_str(point: Point) -> Tuple[str, str]:
+    lattice = getattr(point, "lattice", None)
+    if lattice is None:
+        coordinates = to_lattice((point.alpha, point.beta))
+        if np.abs(coordinates - np.rint(coordinates)).max() > 1e-9:
+            return f"{point.alpha:0.3f}", f"{point.beta:0.3f}"
+        lattice = np.rint(coordinates)
+    return alpha_beta_str(lattice)
+
+
 class Vector:
+    __slots__ = ("origin", "end", "delta_alpha", "delta_beta")
+
     def __init__(self, origin: Point, end: Point):
         self.origin = origin
         self.end = end
         self.delta_alpha, self.delta_beta = end - origin
 
-    def plot(self, plotter=plt, color="black", ls=":", marker="o", show_end=True, end_message=None, show_begin=False,
+    def plot(self, plotter=None, color="black", ls=":", marker="o", show_end=True, end_message=None, show_begin=False,
              begin_message=None):
+        plotter = plotter if plotter is not None else get_pyplot()
         to_plot = self.origin.alpha, self.origin.beta, self.delta_alpha, self.delta_beta
 
         plotter.arrow(*to_plot, ls=ls, color=color)
@@ -112,8 +132,8 @@ class Vector:
         return np.array([[self.delta_alpha], [self.delta_beta]])
 
     def __str__(self):
-        al, bet = Fraction(self.origin.alpha).limit_denominator(3), Fraction(self.origin.beta).limit_denominator(3)
-        eal, ebet = Fraction(self.end.alpha).limit_denominator(3), Fraction(self.end.beta).limit_denominator(3)
+        al, bet = _exact_str(self.origin)
+        eal, ebet = _exact_str(self.end)
         return f"Origin:\n\t al: {al}, bet: {bet},\nEnd: \n\t al: {eal}, " \
                f"bet: {ebet}\nDelta Alpha: {self.delta_alpha}, Delta Beta: {self.delta_beta}"
 
@@ -131,6 +151,8 @@ class Vector:
 
 
 class VoltageLevelVector(Vector):
+    __slots__ = ()
+
     def __init__(self, origin: PointFromNumber, end: PointFromNumber):
         self.origin = origin
         self.end = end
@@ -140,7 +162,94 @@ class VoltageLevelVector(Vector):
         return VoltageLevelVector(self.origin.symmetric(), self.end.symmetric())
 
 
+class PointSet:
+    """ Many points held as contiguous alpha and beta arrays. """
+    __slots__ = ("alpha", "beta")
+
+    def __init__(self, alpha, beta):
+        self.alpha, self.beta = np.broadcast_arrays(np.asarray(alpha, dtype=float), np.asarray(beta, dtype=float))
+
+    @classmethod
+    def from_points(cls, points: Iterable[Point]):
+        points = list(points)
+        return cls([point.alpha for point in points], [point.beta for point in points])
+
+    @classmethod
+    def from_array(cls, points: np.array):
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        return cls(points[:, 0], points[:, 1])
+
+    def __len__(self):
+        return len(self.alpha)
+
+    def __getitem__(self, index):
+        if np.ndim(index) == 0 and not isinstance(index, slice):
+            return Point(float(self.alpha[index]), float(self.beta[index]))
+        return PointSet(self.alpha[index], self.beta[index])
+
+    def __sub__(self, other):
+        return self.alpha - other.alpha, self.beta - other.beta
+
+    def __str__(self):
+        return f"PointSet of {len(self)} points"
+
+    def to_array(self) -> np.array:
+        return np.stack((self.alpha, self.beta), axis=-1)
+
+    def symmetric(self):
+        return PointSet(-self.alpha, -self.beta)
+
+
+class VectorSet:
+    """ Many vectors held as arrays of origins and deltas, the array counterpart of Vector. """
+    __slots__ = ("origin", "delta_alpha", "delta_beta")
+
+    def __init__(self, origin: PointSet, end: PointSet):
+        self.origin = origin
+        self.delta_alpha, self.delta_beta = end - origin
+
+    @classmethod
+    def from_deltas(cls, origin: PointSet, delta_alpha, delta_beta):
+        vectors = cls.__new__(cls)
+        vectors.origin = origin
+        vectors.delta_alpha, vectors.delta_beta = np.broadcast_arrays(np.asarray(delta_alpha, dtype=float),
+                                                                      np.asarray(delta_beta, dtype=float))
+        return vectors
+
+    @classmethod
+    def from_vectors(cls, vectors: Iterable[Vector]):
+        vectors = list(vectors)
+        return cls(PointSet.from_points(vector.origin for vector in vectors),
+                   PointSet.from_points(vector.end for vector in vectors))
+
+    @property
+    def end(self) -> PointSet:
+        return PointSet(self.origin.alpha + self.delta_alpha, self.origin.beta + self.delta_beta)
+
+    def __len__(self):
+        return len(self.delta_alpha)
+
+    def __getitem__(self, index):
+        if np.ndim(index) == 0 and not isinstance(index, slice):
+            return Vector(self.origin[index], self.end[index])
+        return VectorSet.from_deltas(self.origin[index], self.delta_alpha[index], self.delta_beta[index])
+
+    def to_array(self) -> np.array:
+        return np.stack((self.delta_alpha, self.delta_beta), axis=-1)
+
+    def __mul__(self, other):
+        """ Scales every vector by a scalar or by one factor per vector. """
+        return VectorSet.from_deltas(self.origin, other * self.delta_alpha, other * self.delta_beta)
+
+    def concatenate(self, other):
+        return VectorSet.from_deltas(other.end, self.delta_alpha, self.delta_beta)
+
+    def symmetric(self):
+        return VectorSet.from_deltas(self.origin.symmetric(), -self.delta_alpha, -self.delta_beta)
+
+
 if __name__ == "__main__":
+    plt = get_pyplot()
     states = [to_binary_list(state) for state in range(64)]
 
     vectors = dict()
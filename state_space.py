@@ -0,0 +1,96 @@
+"""
+Switching states of open-end winding drives fed by any number of multilevel inverters, as NumPy arrays.
+
+Every inverter has three poles (U, V, W) with levels 0 to L - 1, sitting at level / (L - 1) - 1/2 of its dc
+voltage. State numbers are the pole levels read as base L digits, inverter 1 U being the most significant one,
+so the dual two-level case reproduces the numbering of switching_states. The winding of each phase sees the
+signed sum of its poles, inverters alternating + and - (both ends of an open-end winding).
+"""
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from transformations.Clarke import clarke_matrix
+
+phase_count = 3
+
+
+class StateSpace:
+    def __init__(self, inverters: int = 2, levels: int = 2, signs: Sequence[int] = None):
+        self.inverters = inverters
+        self.levels = levels
+        self.pole_count = phase_count * inverters
+        self.state_count = levels ** self.pole_count
+        self.signs = np.array(signs if signs is not None else [(-1) ** i for i in range(inverters)])
+        if len(self.signs) != inverters:
+            raise ValueError(f"Expected {inverters} signs, got {len(self.signs)}")
+
+        weights = levels ** np.arange(self.pole_count - 1, -1, -1, dtype=np.int64)
+        self.weights = weights
+        numbers = np.arange(self.state_count, dtype=np.int64)
+        # pole_levels[state, inverter * 3 + phase]
+        self.pole_levels = (numbers[:, None] // weights % levels).astype(np.int8)
+        pole_voltages = self.pole_levels / (levels - 1) - 1 / 2
+        self.differences = np.einsum("sip,i->sp", pole_voltages.reshape(-1, inverters, phase_count), self.signs)
+
+        delta_u, delta_v, delta_w = self.differences.transpose()
+        self.phase_voltages = np.stack((2 / 3 * delta_u - 1 / 3 * (delta_v + delta_w),
+                                        2 / 3 * delta_v - 1 / 3 * (delta_u + delta_w),
+                                        2 / 3 * delta_w - 1 / 3 * (delta_v + delta_u)), axis=1)
+        # One vector product per state, the same rounding as clark on a single state
+        self.alpha_beta_gamma = np.matmul(self.phase_voltages[:, None, :], clarke_matrix.transpose())[:, 0]
+        self.alpha_beta = self.alpha_beta_gamma[:, :2]
+        # Exact hexagonal lattice coordinates (see lattice.py) in units of 1 / (L - 1): m = du - dv, n = dv - dw,
+        # from the integer levels so no float rounding is involved
+        signed_levels = np.einsum("sip,i->sp", self.pole_levels.reshape(-1, inverters, phase_count).astype(np.int64),
+                                  self.signs.astype(np.int64))
+        self.lattice = np.stack((signed_levels[:, 0] - signed_levels[:, 1],
+                                 signed_levels[:, 1] - signed_levels[:, 2]), axis=1)
+
+    def numbers(self, pole_levels: np.array) -> np.array:
+        return np.asarray(pole_levels, dtype=np.int64) @ self.weights
+
+    def negation(self) -> np.array:
+        """ State with every pole level mirrored, whose vector is the opposite one. """
+        return self.numbers(self.levels - 1 - self.pole_levels)
+
+    def rotations(self) -> np.array:
+        """ (6, S) table: rotations()[k, n] is the state of the vector of n rotated by k * 60 degrees. """
+        # +60 degrees: every phase takes the levels of the phase lagging it (-120 degrees), then all are mirrored
+        lagging = (np.arange(self.pole_count).reshape(-1, phase_count)[:, [1, 2, 0]]).reshape(-1)
+        rotations = [np.arange(self.state_count)]
+        rotated = self.pole_levels
+        for _ in range(5):
+            rotated = self.levels - 1 - rotated[:, lagging]
+            rotations.append(self.numbers(rotated))
+        return np.stack(rotations)
+
+    def group(self) -> Tuple[np.array, Tuple[Tuple[int, ...], ...]]:
+        """
+        Redundancy group of every state and the states of every group, numbered by their lowest state.
+
+        States are grouped on their integer lattice point, so float noise cannot split or merge groups.
+        """
+        _, first, inverse = np.unique(self.lattice, axis=0, return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(order.size)
+        group = rank[inverse.reshape(-1)]
+        members = np.argsort(group, kind="stable")
+        bounds = np.cumsum(np.bincount(group, minlength=order.size))[:-1]
+        groups = tuple(tuple(int(n) for n in states) for states in np.split(members, bounds))
+        return group, groups
+
+    def negation_symmetric(self) -> np.array:
+        """ Whether the vector of every state is the opposite of the one of its negated state. """
+        return np.all(self.lattice[self.negation()] == -self.lattice, axis=1)
+
+    def rotation_symmetric(self) -> np.array:
+        """ (6, S) whether every rotated state lands on the vector rotated by k * 60 degrees. """
+        m, n = self.lattice.transpose()
+        # (m, n) -> (-n, m + n) rotates by 60 degrees
+        expected = [self.lattice]
+        for _ in range(5):
+            m, n = -n, m + n
+            expected.append(np.stack((m, n), axis=1))
+        return np.all(self.lattice[self.rotations()] == np.stack(expected), axis=-1)
@@ -0,0 +1,107 @@
+import itertools
+from typing import Optional, Tuple
+
+import numpy as np
+
+from hexagon_svm import HexagonSVM, sector_count
+from switching_states import GROUPS, TRANSITIONS, state_count
+
+sub_sector_count = 4
+# Configuration used for references outside the hexagon: the previous state is held for the whole period
+outside_configuration = sector_count * sub_sector_count
+
+
+def _candidates(groups: Tuple[int, int, int]) -> np.array:
+    """ (K, 4) candidate sequences: three states and whether the vertices are applied in reverse (C, B, A). """
+    forward = list(itertools.product(*(GROUPS[group] for group in groups)))
+    candidates = [states + (0,) for states in forward] + [states[::-1] + (1,) for states in forward]
+    return np.array(candidates, dtype=np.int64)
+
+
+def _build_tables(engine: HexagonSVM) -> Tuple[np.array, np.array]:
+    """
+    choice[configuration, previous state] -> (state 1, state 2, state 3, reversed), minimizing gate transitions
+    from the previous state through the three sub-intervals.
+    """
+    choice = np.empty((outside_configuration + 1, state_count, 4), dtype=np.int64)
+    previous = np.arange(state_count)
+    for sector in range(sector_count):
+        for sub_sector in range(sub_sector_count):
+            candidates = _candidates(tuple(engine.vertex_groups[sector, sub_sector]))
+            internal = TRANSITIONS[candidates[:, 0], candidates[:, 1]] + TRANSITIONS[candidates[:, 1], candidates[:, 2]]
+            cost = TRANSITIONS[previous[:, None], candidates[None, :, 0]] + internal[None]
+            choice[sector * sub_sector_count + sub_sector] = candidates[np.argmin(cost, axis=1)]
+    choice[outside_configuration] = np.stack((previous, previous, previous, np.zeros(state_count, int)), axis=1)
+    return choice, choice[..., 2]
+
+
+class SwitchingSequenceGenerator:
+    """
+    Turns dwell times into gate patterns, one carrier period at a time.
+
+    Every period applies the three vertices of its sub sector. The redundant state of each vertex and the
+    direction (A, B, C or C, B, A) are the ones with the fewest gate transitions counted from the last state of
+    the previous period. Gates are bit packed in a uint8 per sub-interval, with the state number convention: U1
+    is bit 5 and W2 bit 0.
+
+    generate can be called with consecutive chunks, the last state and time are kept between calls.
+    """
+
+    def __init__(self, period: float, engine: Optional[HexagonSVM] = None, initial_state: int = 0,
+                 start_time: float = 0.0):
+        self.period = period
+        self.engine = engine if engine is not None else HexagonSVM()
+        self.choice, self.following = _build_tables(self.engine)
+        self._following = self.following.tolist()
+        self.state = initial_state
+        self.time = start_time
+
+    def _starting_states(self, configuration: np.array) -> np.array:
+        """ State each period starts from, following the choice table run by run of equal configurations. """
+        starts = np.empty(len(configuration), dtype=np.int64)
+        boundaries = np.flatnonzero(np.diff(configuration)) + 1
+        state = self.state
+        for begin, end in zip(itertools.chain((0,), boundaries), itertools.chain(boundaries, (len(configuration),))):
+            following = self._following[configuration[begin]]
+            seen = {}
+            index = begin
+            # Within a run the states settle into a short cycle (alternating directions) after a few periods
+            while index < end:
+                if state in seen:
+                    cycle = starts[seen[state]:index]
+                    starts[index:end] = np.resize(cycle, end - index)
+                    state = int(cycle[(end - seen[state]) % len(cycle)])
+                    break
+                seen[state] = index
+                starts[index] = state
+                index += 1
+                state = following[state]
+        self.state = state
+        return starts
+
+    def generate(self, sector: np.array, sub_sector: np.array, t1: np.array, t2: np.array) \
+            -> Tuple[np.array, np.array]:
+        """
+        :return: start timestamps and packed gates of every sub-interval, three per period
+        """
+        sub_sector = np.asarray(sub_sector)
+        configuration = np.where(sub_sector < 0, outside_configuration,
+                                 np.asarray(sector) * sub_sector_count + sub_sector)
+        if len(configuration) == 0:
+            return np.empty(0), np.empty(0, dtype=np.uint8)
+        choice = self.choice[configuration, self._starting_states(configuration)]
+
+        t0 = 1 - np.asarray(t1) - np.asarray(t2)
+        durations = np.stack((t0, t1, t2), axis=1)
+        durations = np.where(choice[:, 3:] == 1, durations[:, ::-1], durations)
+        durations[sub_sector < 0] = (1, 0, 0)
+        offsets = np.cumsum(durations, axis=1) - durations
+        starts = self.time + self.period * np.arange(len(configuration))
+        timestamps = (starts[:, None] + self.period * offsets).reshape(-1)
+
+        self.time += self.period * len(configuration)
+        return timestamps, choice[:, :3].astype(np.uint8).reshape(-1)
+
+    def generate_from_references(self, points: np.array) -> Tuple[np.array, np.array]:
+        sector, sub_sector, t1, t2, _ = self.engine.solve(points)
+        return self.generate(sector, sub_sector, t1, t2)
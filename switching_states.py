@@ -0,0 +1,50 @@
+from typing import Dict, Tuple
+
+import numpy as np
+
+from state_space import StateSpace
+from transformations.Clarke import clarke_matrix
+
+# Dual two-level inverter: gates ordered (U1, V1, W1, U2, V2, W2), U1 being the most significant bit
+gate_count = 6
+state_count = 2 ** gate_count
+
+
+def _read_only(array: np.array) -> np.array:
+    array.setflags(write=False)
+    return array
+
+
+_space = StateSpace(inverters=2, levels=2)
+
+GATES = _read_only(_space.pole_levels)
+PHASE_VOLTAGES = _read_only(_space.phase_voltages)
+ALPHA_BETA_GAMMA = _read_only(_space.alpha_beta_gamma)
+ALPHA_BETA = _read_only(ALPHA_BETA_GAMMA[:, :2].copy())
+# Exact lattice coordinates (m, n) of every state, see lattice.py
+STATE_LATTICE = _read_only(_space.lattice)
+LATTICE_TUPLES = tuple(map(tuple, STATE_LATTICE.tolist()))
+# Lattice point -> states applying it, in order of their lowest state
+LATTICE_STATES: Dict[Tuple[int, int], Tuple[int, ...]] = {}
+for _state, _point in enumerate(LATTICE_TUPLES):
+    LATTICE_STATES[_point] = LATTICE_STATES.get(_point, ()) + (_state,)
+# Redundant states share a lattice point, groups are numbered by their lowest state
+GROUPS = tuple(LATTICE_STATES.values())
+_group_of_point = {point: group for group, point in enumerate(LATTICE_STATES)}
+REDUNDANCY_GROUP = _read_only(np.array([_group_of_point[point] for point in LATTICE_TUPLES]))
+STATE_TUPLES = tuple(tuple(int(gate) for gate in gates) for gates in GATES)
+# STATE_ROTATION[k, n] is the state whose vector is the one of state n rotated by k * 60 degrees
+STATE_ROTATION = _read_only(_space.rotations())
+GROUP_ROTATION = _read_only(REDUNDANCY_GROUP[STATE_ROTATION[:, [group[0] for group in GROUPS]]])
+# Number of gates that switch between any two states
+TRANSITIONS = _read_only(np.abs(GATES[:, None] - GATES[None]).sum(axis=-1))
+# Winding voltages (du, dv, dw) before the zero sequence is removed, and their gamma: PHASE_VOLTAGES sum to zero
+# so their gamma always is, but redundant states differ in the zero sequence they apply to the open-end winding
+POLE_DIFFERENCES = _read_only(_space.differences)
+ZERO_SEQUENCE = _read_only(POLE_DIFFERENCES @ clarke_matrix[2])
+# Common mode voltage of each inverter (mean of its three poles, in Vdc), columns inverter 1 and 2
+COMMON_MODE = _read_only((GATES.reshape(-1, 2, 3) - 1 / 2).mean(axis=-1))
+
+
+def redundant_states(number: int) -> Tuple[int, ...]:
+    return GROUPS[REDUNDANCY_GROUP[number]]
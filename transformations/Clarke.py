@@ -3,6 +3,8 @@ import math
 import numpy as np
 from numpy import linalg
 
+from profiling import profiled
+
 # Here we calculate the POWER invariant transformation
 clarke_matrix = np.sqrt(2 / 3) * np.array(
     [[1, -1 / 2, -1 / 2],
@@ -11,9 +13,11 @@ clarke_matrix = np.sqrt(2 / 3) * np.array(
 inverse_clarke_matrix = linalg.inv(clarke_matrix)
 
 
+@profiled()
 def clark(input_signal: np.array) -> np.array:
     return np.matmul(clarke_matrix, input_signal)
 
 
+@profiled()
 def inv_clark(input_signal: np.array) -> np.array:
     return np.matmul(inverse_clarke_matrix, input_signal)
@@ -1,5 +1,6 @@
 import numpy as np
-from numpy import linalg
+
+from transformations.batch import park_batch, inv_park_batch
 
 phi = np.pi * 2 / 3
 
@@ -11,17 +12,21 @@ def park_matrix(theta: float) -> np.array:
 
 
 def inv_park_matrix(theta: float) -> np.array:
-    return linalg.inv(park_matrix(theta))
+    # The rotation is orthogonal, its inverse is its transpose
+    return park_matrix(theta).transpose()
 
 
 def park(theta: float, alpha_beta_gamma: np.array) -> np.array:
     if not isinstance(theta, float):
-        return np.array([np.matmul(park_matrix(theta_i), alpha_beta_gamma[:, i]) for i, theta_i in enumerate(theta)]) \
-            .transpose()
+        return park_batch(np.asarray(theta), np.asarray(alpha_beta_gamma, dtype=float))
     return np.matmul(park_matrix(theta), alpha_beta_gamma)
 
 
 def inv_park(theta, dq):
     if not isinstance(theta, float):
-        return np.array([np.matmul(inv_park_matrix(theta_i), dq) for i, theta_i in enumerate(theta)])
+        theta = np.asarray(theta, dtype=float)
+        dq = np.asarray(dq, dtype=float)
+        if dq.ndim == 1:
+            dq = np.broadcast_to(dq.reshape(3, 1), (3, theta.size))
+        return inv_park_batch(theta, dq).transpose()
     return np.matmul(inv_park_matrix(theta), dq)
@@ -0,0 +1,76 @@
+from typing import Optional
+
+import numpy as np
+
+from transformations.Clarke import clarke_matrix, inverse_clarke_matrix
+
+float_types = (np.float32, np.float64)
+
+
+def _output(signal: np.array, out: Optional[np.array], dtype) -> np.array:
+    if dtype is None:
+        dtype = out.dtype if out is not None else np.result_type(signal.dtype, np.float32)
+    dtype = np.dtype(dtype)
+    if dtype.type not in float_types:
+        raise TypeError(f"Only float32 and float64 are supported, got {dtype}")
+    if signal.shape[0] != 3:
+        raise ValueError(f"Expected a (3, N) signal, got shape {signal.shape}")
+    if out is None:
+        return np.empty(signal.shape, dtype=dtype)
+    if out.shape != signal.shape or out.dtype != dtype:
+        raise ValueError(f"out must have shape {signal.shape} and dtype {dtype}")
+    return out
+
+
+def _rotate(theta, out: np.array, inverse: bool) -> np.array:
+    # A single angle rotates every sample, sin must be a full array as it is reused as a buffer
+    theta = np.broadcast_to(np.asarray(theta, dtype=out.dtype), out.shape[1:])
+    cos = np.cos(theta)
+    sin = np.sin(theta, out=np.empty(out.shape[1:], dtype=out.dtype))
+    # Ellipsis keeps 0-d views for a single (3,) vector
+    first, second = out[0, ...], out[1, ...]
+    if inverse:
+        sin_first = sin * first
+        first *= cos
+        first -= np.multiply(sin, second, out=sin)
+        second *= cos
+        second += sin_first
+    else:
+        sin_first = sin * first
+        first *= cos
+        first += np.multiply(sin, second, out=sin)
+        second *= cos
+        second -= sin_first
+    return out
+
+
+def park_batch(theta, alpha_beta_gamma: np.array, out: np.array = None, dtype=None) -> np.array:
+    alpha_beta_gamma = np.asarray(alpha_beta_gamma)
+    out = _output(alpha_beta_gamma, out, dtype)
+    if out is not alpha_beta_gamma:
+        np.copyto(out, alpha_beta_gamma, casting="same_kind")
+    return _rotate(theta, out, inverse=False)
+
+
+def inv_park_batch(theta, dq: np.array, out: np.array = None, dtype=None) -> np.array:
+    dq = np.asarray(dq)
+    out = _output(dq, out, dtype)
+    if out is not dq:
+        np.copyto(out, dq, casting="same_kind")
+    return _rotate(theta, out, inverse=True)
+
+
+def abc_to_dq(theta, abc: np.array, out: np.array = None, dtype=None) -> np.array:
+    """ Fused Clarke and Park transformation of a (3, N) abc signal. """
+    abc = np.asarray(abc)
+    out = _output(abc, out, dtype)
+    np.matmul(clarke_matrix.astype(out.dtype), abc.astype(out.dtype, copy=False), out=out)
+    return _rotate(theta, out, inverse=False)
+
+
+def dq_to_abc(theta, dq: np.array, out: np.array = None, dtype=None) -> np.array:
+    """ Fused inverse Park and inverse Clarke transformation of a (3, N) dq signal. """
+    dq = np.asarray(dq)
+    out = _output(dq, out, dtype)
+    alpha_beta_gamma = _rotate(theta, dq.astype(out.dtype, copy=True), inverse=True)
+    return np.matmul(inverse_clarke_matrix.astype(out.dtype), alpha_beta_gamma, out=out)
@@ -1,9 +1,19 @@
+import heapq
+from typing import Callable, Iterable, Iterator, Optional, Tuple
 
+import numpy as np
+
+from profiling import count, profiled
+
+
+@profiled()
 def natural_sampling(carrier_signal, modulated_signal):
     output = [-1 if carrier > modulated else 1 for carrier, modulated in zip(carrier_signal.out, modulated_signal.out)]
+    count("samples", len(output))
     return output
 
 
+@profiled()
 def uniform_sampling(carrier_signal, modulated_signal, enable_read, read):
     output = []
     old_value = 0
@@ -30,6 +40,7 @@ def uniform_sampling(carrier_signal, modulated_signal, enable_read, read):
         old_value = y
         sampled.append(hold)
         output.append(state)
+    count("samples", len(output))
     return output, sampled
 
 
@@ -61,3 +72,256 @@ def asymmetrical_sampling(carrier_signal, modulated_signal):
         return read_enabled
 
     return uniform_sampling(carrier_signal, modulated_signal, enable_read, read)
+
+
+class UniformSampler:
+    """
+    Array implementation of uniform_sampling for the symmetrical and asymmetrical read rules.
+
+    process can be called repeatedly with consecutive chunks of the carrier and modulated signals, the slope, hold
+    and read state are carried over so the concatenated chunks equal the output of a single call.
+    """
+
+    def __init__(self, symmetrical: bool):
+        self.symmetrical = symmetrical
+        self.started = False
+        # Last carrier value, the carrier value it was compared against and whether that sample was skipped
+        self.last_value = 0.0
+        self.last_old_value = 0.0
+        self.last_skipped = False
+        self.hold = 0.0
+        self.read_enabled = False
+
+    def _old_values(self, carrier: np.array) -> Tuple[np.array, np.array]:
+        """ old_value seen by every sample and whether the sample is skipped (its old_delta being 0). """
+        previous = np.concatenate(([self.last_value], carrier[:-1]))
+        old_value = previous.copy()
+        if self.last_skipped:
+            old_value[0] = self.last_old_value
+        skipped = np.empty(len(carrier), dtype=bool)
+        skipped[0] = self.last_value == self.last_old_value
+        skipped[1:] = previous[1:] == old_value[:-1]
+
+        # A skipped sample does not update old_value, which only matters around flat carrier steps
+        pending = np.flatnonzero(skipped).tolist()
+        heapq.heapify(pending)
+        while pending:
+            i = heapq.heappop(pending)
+            if not skipped[i] or i + 1 >= len(carrier):
+                continue
+            old_value[i + 1] = old_value[i]
+            if i + 2 < len(carrier):
+                was_skipped = skipped[i + 2]
+                skipped[i + 2] = previous[i + 2] == old_value[i + 1]
+                if skipped[i + 2] and not was_skipped:
+                    heapq.heappush(pending, i + 2)
+        return old_value, skipped
+
+    def process(self, carrier, modulated) -> Tuple[np.array, np.array]:
+        carrier = np.asarray(carrier, dtype=float)
+        modulated = np.asarray(modulated, dtype=float)
+        if carrier.shape != modulated.shape:
+            raise ValueError(f"Carrier and modulated chunks differ in shape: {carrier.shape} {modulated.shape}")
+        count("samples", len(carrier))
+        output, sampled = self._process(carrier, modulated)
+        if not self.started:
+            self.started = True
+            output = np.concatenate(([0], output)).astype(np.int8)
+            sampled = np.concatenate(([0.0], sampled))
+        return output, sampled
+
+    def _process(self, carrier: np.array, modulated: np.array) -> Tuple[np.array, np.array]:
+        if len(carrier) == 0:
+            return np.empty(0, dtype=np.int8), np.empty(0)
+        old_value, skipped = self._old_values(carrier)
+        previous_old_value = np.concatenate(([self.last_old_value], old_value[:-1]))
+        previous = np.concatenate(([self.last_value], carrier[:-1]))
+        delta = carrier - old_value
+        old_delta = previous - previous_old_value
+        processed = ~skipped
+
+        reversal = delta * old_delta < 0
+        falling = (old_value > modulated) & (modulated > carrier)
+        if self.symmetrical:
+            enable = reversal & (carrier > 0)
+            crossing = falling
+        else:
+            enable = reversal
+            crossing = falling | ((old_value < modulated) & (modulated < carrier))
+        enable &= processed
+        crossing &= processed
+
+        # A crossing reads the modulated signal when an enable happened after the previous crossing
+        position = np.arange(1, len(carrier) + 1)
+        last_enable = np.maximum.accumulate(np.where(enable, position, -1))
+        np.maximum(last_enable, 0 if self.read_enabled else -1, out=last_enable)
+        last_crossing = np.maximum.accumulate(np.where(crossing, position, -1))
+        previous_crossing = np.concatenate(([-1], last_crossing[:-1]))
+        read = crossing & (last_enable > previous_crossing)
+
+        last_read = np.maximum.accumulate(np.where(read, position - 1, -1))
+        hold = np.where(last_read >= 0, modulated[np.maximum(last_read, 0)], self.hold)
+        state = np.where(hold < carrier, -1, 1).astype(np.int8)
+
+        self.read_enabled = bool(last_enable[-1] > last_crossing[-1])
+        self.hold = hold[-1]
+        self.last_value = carrier[-1]
+        self.last_old_value = old_value[-1]
+        self.last_skipped = bool(skipped[-1])
+        return state[processed], hold[processed]
+
+
+@profiled()
+def natural_sampling_array(carrier_signal, modulated_signal) -> np.array:
+    carrier, modulated = _signal_arrays(carrier_signal, modulated_signal)
+    count("samples", len(carrier))
+    return np.where(carrier > modulated, -1, 1).astype(np.int8)
+
+
+@profiled()
+def symmetrical_sampling_array(carrier_signal, modulated_signal) -> Tuple[np.array, np.array]:
+    return UniformSampler(symmetrical=True).process(*_signal_arrays(carrier_signal, modulated_signal))
+
+
+@profiled()
+def asymmetrical_sampling_array(carrier_signal, modulated_signal) -> Tuple[np.array, np.array]:
+    return UniformSampler(symmetrical=False).process(*_signal_arrays(carrier_signal, modulated_signal))
+
+
+def natural_sampling_chunks(carrier_chunks: Iterable, modulated_chunks: Iterable) -> Iterator[np.array]:
+    for carrier, modulated in zip(carrier_chunks, modulated_chunks):
+        yield np.where(np.asarray(carrier) > np.asarray(modulated), -1, 1).astype(np.int8)
+
+
+def symmetrical_sampling_chunks(carrier_chunks: Iterable, modulated_chunks: Iterable) \
+        -> Iterator[Tuple[np.array, np.array]]:
+    sampler = UniformSampler(symmetrical=True)
+    for carrier, modulated in zip(carrier_chunks, modulated_chunks):
+        yield sampler.process(carrier, modulated)
+
+
+def asymmetrical_sampling_chunks(carrier_chunks: Iterable, modulated_chunks: Iterable) \
+        -> Iterator[Tuple[np.array, np.array]]:
+    sampler = UniformSampler(symmetrical=False)
+    for carrier, modulated in zip(carrier_chunks, modulated_chunks):
+        yield sampler.process(carrier, modulated)
+
+
+def _signal_arrays(carrier_signal, modulated_signal) -> Tuple[np.array, np.array]:
+    carrier = np.asarray(carrier_signal.out, dtype=float)
+    modulated = np.asarray(modulated_signal.out, dtype=float)
+    length = min(len(carrier), len(modulated))
+    return carrier[:length], modulated[:length]
+
+
+def _edges(times: np.array, start_difference: np.array, end_difference: np.array, roots: Callable) \
+        -> Tuple[np.array, np.array]:
+    """
+    Switching edges from carrier - modulating at both ends of every carrier segment.
+
+    An edge lies inside a segment whose ends have different states (found by roots on those segments) or on the
+    boundary between two segments when the state jumps there (carrier resets, new regular sample).
+    """
+    start_state = np.where(start_difference > 0, -1, 1).astype(np.int8)
+    end_state = np.where(end_difference > 0, -1, 1).astype(np.int8)
+    boundary = np.zeros(len(start_state), dtype=bool)
+    boundary[1:] = start_state[1:] != end_state[:-1]
+    inside = np.flatnonzero(start_state != end_state)
+    # Zero length segments are carrier resets, their edge is the reset itself
+    sloped = inside[times[inside + 1] > times[inside]]
+
+    # Candidates interleaved per segment: boundary edge at its start, then the edge inside it
+    timestamps = np.repeat(times[:-1, None], 2, axis=1)
+    timestamps[sloped, 1] = roots(sloped)
+    states = np.stack((start_state, end_state), axis=1)
+    found = np.stack((boundary, np.zeros_like(boundary)), axis=1)
+    found[inside, 1] = True
+    found[0, 0] = True
+    return timestamps[found], states[found]
+
+
+def _span(carrier, start: Optional[float], stop: Optional[float]) -> Tuple[float, float]:
+    return (carrier.start_time if start is None else start), (carrier.end_time if stop is None else stop)
+
+
+def natural_sampling_edges(carrier, modulating, start: float = None, stop: float = None, iterations: int = 60,
+                           tolerance: float = 1e-15) -> Tuple[np.array, np.array]:
+    """
+    Exact natural sampling of a piecewise linear carrier (transformations.signals carriers) and an analytic
+    modulating signal (any at(t)), assuming at most one crossing per carrier segment.
+
+    Crossing instants are refined together for all the segments with the Illinois variant of regula falsi, so the
+    cost grows with the number of carrier periods, not with the sampling resolution.
+
+    Sampled on a grid these edges reproduce natural_sampling_array, except where a sawtooth reset falls exactly on
+    a grid instant: the carrier jumps there, and whether the sample sees the value before or after the jump depends
+    on float rounding of t * frequency, so such samples are ambiguous.
+
+    :return: timestamps of the state changes, the first one being start, and the state from each of them on
+     (-1 while the carrier is above the modulating signal, 1 otherwise, as natural_sampling)
+    """
+    start, stop = _span(carrier, start, stop)
+    times, values = carrier.breakpoints(start, stop)
+    levels = modulating.at(times)
+    if len(times) < 2:
+        return np.array([start]), np.where(values[:1] > levels[:1], -1, 1).astype(np.int8)
+
+    def roots(segments: np.array) -> np.array:
+        low, high = times[segments], times[segments + 1]
+        slope = (values[segments + 1] - values[segments]) / (high - low)
+        segment_start, segment_value = low.copy(), values[segments]
+        low_value = values[segments] - levels[segments]
+        high_value = values[segments + 1] - levels[segments + 1]
+        side = np.zeros(len(segments), dtype=np.int8)
+        for _ in range(iterations):
+            root = (low * high_value - high * low_value) / (high_value - low_value)
+            value = segment_value + slope * (root - segment_start) - modulating.at(root)
+            same_as_low = np.sign(value) == np.sign(low_value)
+            # Illinois: halve the value kept twice in a row so the bracket shrinks from both sides
+            low, low_value = np.where(same_as_low, root, low), np.where(same_as_low, value, low_value)
+            high, high_value = np.where(same_as_low, high, root), np.where(same_as_low, high_value, value)
+            high_value = np.where(same_as_low & (side == 1), high_value / 2, high_value)
+            low_value = np.where(~same_as_low & (side == -1), low_value / 2, low_value)
+            side = np.where(same_as_low, 1, -1).astype(np.int8)
+            if np.all(high - low <= tolerance * np.maximum(np.abs(high), 1)) or np.all(value == 0):
+                break
+        return (low * high_value - high * low_value) / (high_value - low_value)
+
+    return _edges(times, values[:-1] - levels[:-1], values[1:] - levels[1:], roots)
+
+
+def regular_sampling_edges(carrier, modulating, start: float = None, stop: float = None, symmetrical: bool = True) \
+        -> Tuple[np.array, np.array]:
+    """
+    Regular sampling with exact edges of the linear carrier: the modulating signal is sampled at every carrier
+    maximum (symmetrical) or at every maximum and minimum (asymmetrical) and held until the next sample.
+
+    This is the textbook regular sampling modulator, not an exact version of symmetrical_sampling and
+    asymmetrical_sampling, which latch the modulating signal when the falling carrier crosses it; their outputs
+    differ around the edges.
+    """
+    start, stop = _span(carrier, start, stop)
+    times, values = carrier.breakpoints(start, stop)
+    # Sample instants: carrier maximums (symmetrical) or every extreme (asymmetrical), the start always samples
+    extreme = np.zeros(len(times), dtype=bool)
+    extreme[1:-1] = True
+    if symmetrical:
+        extreme[1:-1] = values[1:-1] >= np.max(values[1:-1], initial=-np.inf)
+    extreme[0] = True
+    sample = np.maximum.accumulate(np.where(extreme, np.arange(len(times)), 0))
+    hold = modulating.at(times)[sample]
+    if len(times) < 2:
+        return np.array([start]), np.where(values[:1] > hold[:1], -1, 1).astype(np.int8)
+    # The level of a segment is the one held from its start
+    level = hold[:-1]
+
+    def roots(segments: np.array) -> np.array:
+        low, high = times[segments], times[segments + 1]
+        return low + (level[segments] - values[segments]) / (values[segments + 1] - values[segments]) * (high - low)
+
+    return _edges(times, values[:-1] - level, values[1:] - level, roots)
+
+
+def edges_to_samples(timestamps: np.array, states: np.array, t: np.array) -> np.array:
+    """ State at every instant t, to compare the edges with the per sample functions. """
+    return states[np.maximum(np.searchsorted(timestamps, t, side="right") - 1, 0)]
@@ -0,0 +1,218 @@
+"""
+Carrier and modulating signal sources for transformations.sampling.
+
+A signal is sampled every sample_time for length samples and is defined analytically by at(t). .out builds the
+whole array on first use and memoizes it, keyed by the signal parameters, in a process wide LRU bounded by a byte
+budget; cached arrays are read-only because they are shared. chunks(size) yields the same samples block by block
+without keeping them.
+"""
+import hashlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterator, Optional, Tuple
+
+import numpy as np
+
+cache_budget = 256 * 2 ** 20
+_cache: "OrderedDict[Hashable, np.array]" = OrderedDict()
+_cache_bytes = 0
+
+
+def set_cache_budget(budget: int):
+    global cache_budget
+    cache_budget = budget
+    _evict()
+
+
+def clear_cache():
+    global _cache_bytes
+    _cache.clear()
+    _cache_bytes = 0
+
+
+def cache_size() -> Tuple[int, int]:
+    """ Entries and bytes currently held. """
+    return len(_cache), _cache_bytes
+
+
+def _evict():
+    global _cache_bytes
+    while _cache and _cache_bytes > cache_budget:
+        _, evicted = _cache.popitem(last=False)
+        _cache_bytes -= evicted.nbytes
+
+
+def cached_array(key: Hashable, build: Callable[[], np.array]) -> np.array:
+    global _cache_bytes
+    array = _cache.get(key)
+    if array is not None:
+        _cache.move_to_end(key)
+        return array
+    array = build()
+    array.setflags(write=False)
+    if array.nbytes <= cache_budget:
+        _cache[key] = array
+        _cache_bytes += array.nbytes
+        _evict()
+    return array
+
+
+def _clip_breakpoints(times: np.array, values: np.array, start: float, stop: float, at: Callable) \
+        -> Tuple[np.array, np.array]:
+    inside = (times > start) & (times < stop)
+    # at() is right continuous, a reset falling on stop must end with the value reached before it
+    at_stop = np.flatnonzero(times == stop)
+    stop_value = values[at_stop[:1]] if at_stop.size else at([stop])
+    times = np.concatenate(([start], times[inside], [stop]))
+    values = np.concatenate((at([start]), values[inside], stop_value))
+    return times, values
+
+
+class Signal(ABC):
+    def __init__(self, sample_time: float, length: int, start_time: float = 0.0):
+        self.sample_time = sample_time
+        self.length = int(length)
+        self.start_time = start_time
+
+    @abstractmethod
+    def parameters(self) -> Tuple:
+        """ Everything at(t) depends on, part of the cache key together with the sample grid. """
+
+    @abstractmethod
+    def at(self, t) -> np.array:
+        pass
+
+    def key(self) -> Hashable:
+        return type(self).__name__, self.sample_time, self.length, self.start_time, self.parameters()
+
+    def time(self, start: int = 0, stop: Optional[int] = None) -> np.array:
+        stop = self.length if stop is None else min(stop, self.length)
+        return self.start_time + np.arange(start, stop) * self.sample_time
+
+    def block(self, start: int, stop: int) -> np.array:
+        return self.at(self.time(start, stop))
+
+    @property
+    def out(self) -> np.array:
+        return cached_array(self.key(), lambda: self.block(0, self.length))
+
+    @property
+    def end_time(self) -> float:
+        return self.start_time + self.length * self.sample_time
+
+    def chunks(self, size: int) -> Iterator[np.array]:
+        for start in range(0, self.length, size):
+            yield self.block(start, start + size)
+
+    def __len__(self):
+        return self.length
+
+
+class TriangularCarrier(Signal):
+    """ Symmetric triangle starting every period at its minimum, offset - amplitude, peaking at mid period. """
+
+    def __init__(self, frequency: float, sample_time: float, length: int, amplitude: float = 1.0,
+                 offset: float = 0.0, phase: float = 0.0, start_time: float = 0.0):
+        super().__init__(sample_time, length, start_time)
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self.offset = offset
+        # Fraction of a period
+        self.phase = phase
+
+    def parameters(self) -> Tuple:
+        return self.frequency, self.amplitude, self.offset, self.phase
+
+    def at(self, t) -> np.array:
+        position = np.mod(np.asarray(t) * self.frequency + self.phase, 1.0)
+        return self.offset + self.amplitude * (1 - 4 * np.abs(position - 0.5))
+
+    def breakpoints(self, start: float, stop: float) -> Tuple[np.array, np.array]:
+        """ Times and values of the vertices of the piecewise linear carrier over [start, stop]. """
+        # Minimums sit on whole periods of t * frequency + phase, maximums on half periods
+        first = np.floor(2 * (start * self.frequency + self.phase))
+        last = np.ceil(2 * (stop * self.frequency + self.phase))
+        vertex = np.arange(first, last + 1)
+        times = (vertex / 2 - self.phase) / self.frequency
+        values = self.offset + self.amplitude * np.where(vertex % 2 == 0, -1.0, 1.0)
+        return _clip_breakpoints(times, values, start, stop, self.at)
+
+
+class SawtoothCarrier(Signal):
+    def __init__(self, frequency: float, sample_time: float, length: int, amplitude: float = 1.0,
+                 offset: float = 0.0, phase: float = 0.0, rising: bool = True, start_time: float = 0.0):
+        super().__init__(sample_time, length, start_time)
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self.offset = offset
+        self.phase = phase
+        self.rising = rising
+
+    def parameters(self) -> Tuple:
+        return self.frequency, self.amplitude, self.offset, self.phase, self.rising
+
+    def at(self, t) -> np.array:
+        position = np.mod(np.asarray(t) * self.frequency + self.phase, 1.0)
+        ramp = 2 * position - 1 if self.rising else 1 - 2 * position
+        return self.offset + self.amplitude * ramp
+
+    def breakpoints(self, start: float, stop: float) -> Tuple[np.array, np.array]:
+        """ Times and values of the vertices over [start, stop], every reset appearing twice (end and start). """
+        first = np.floor(start * self.frequency + self.phase)
+        last = np.ceil(stop * self.frequency + self.phase)
+        times = np.repeat((np.arange(first, last + 1) - self.phase) / self.frequency, 2)
+        top, bottom = self.offset + self.amplitude, self.offset - self.amplitude
+        values = np.tile([top, bottom] if self.rising else [bottom, top], len(times) // 2)
+        return _clip_breakpoints(times, values, start, stop, self.at)
+
+
+class Sinusoid(Signal):
+    """
+    amplitude * (sin(wt + phase) + third_harmonic * sin(3 (wt + phase))) + offset.
+
+    A third harmonic of 1/6 of the fundamental extends the linear range of the modulation by 2 / sqrt(3).
+    """
+
+    def __init__(self, frequency: float, sample_time: float, length: int, amplitude: float = 1.0,
+                 phase: float = 0.0, third_harmonic: float = 0.0, offset: float = 0.0, start_time: float = 0.0):
+        super().__init__(sample_time, length, start_time)
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self.phase = phase
+        self.third_harmonic = third_harmonic
+        self.offset = offset
+
+    def parameters(self) -> Tuple:
+        return self.frequency, self.amplitude, self.phase, self.third_harmonic, self.offset
+
+    def at(self, t) -> np.array:
+        angle = 2 * np.pi * self.frequency * np.asarray(t) + self.phase
+        value = np.sin(angle)
+        if self.third_harmonic:
+            value = value + self.third_harmonic * np.sin(3 * angle)
+        return self.offset + self.amplitude * value
+
+
+class Waveform(Signal):
+    """
+    Arbitrary signal from samples of one period (or of the whole run when not periodic), linearly interpolated
+    between them. The cache key holds a SHA-256 digest of the samples, so equal waveforms share their .out array.
+    """
+
+    def __init__(self, samples, sample_spacing: float, sample_time: float, length: int, periodic: bool = True,
+                 start_time: float = 0.0):
+        super().__init__(sample_time, length, start_time)
+        self.samples = np.asarray(samples, dtype=float)
+        self.sample_spacing = sample_spacing
+        self.periodic = periodic
+
+    def parameters(self) -> Tuple:
+        return self.sample_spacing, self.periodic, self.samples.shape, hashlib.sha256(self.samples.tobytes()).hexdigest()
+
+    def at(self, t) -> np.array:
+        position = np.asarray(t) / self.sample_spacing
+        if self.periodic:
+            count = len(self.samples)
+            position = np.mod(position, count)
+            return np.interp(position, np.arange(count + 1), np.append(self.samples, self.samples[0]))
+        return np.interp(position, np.arange(len(self.samples)), self.samples)
@@ -1,19 +1,20 @@
 from functools import reduce
 from typing import List
 from typing import Tuple
-from fractions import Fraction
 
-import matplotlib.pyplot as plt
-
-from transformations.Clarke import clark
-import numpy as np
+from profiling import profiled
+from lattice import STATE_LATTICE, alpha_beta_str, phase_voltages, to_alpha_beta
+from switching_states import STATE_TUPLES, state_count
 
 delta_u = 0, 3
 delta_v = 1, 4
 delta_w = 2, 5
 
 
+@profiled()
 def to_binary_list(number: int) -> Tuple[int]:
+    if 0 <= number < state_count:
+        return STATE_TUPLES[number]
     return tuple([int(bit) for bit in "{0:06b}".format(number)])
 
 
@@ -44,32 +45,27 @@ def delta_voltage(state: Tuple[int, ...], order: List[Tuple[int, int]]) -> float
 
 
 def print_voltages(state: Tuple[int], voltage_number: int):
-    u = [delta_u, delta_v, delta_w]
-    v = [delta_v, delta_u, delta_w]
-    w = [delta_w, delta_v, delta_u]
-
-    u = Fraction(delta_voltage(state, u)).limit_denominator(6)
-    v = Fraction(delta_voltage(state, v)).limit_denominator(6)
-    w = Fraction(delta_voltage(state, w)).limit_denominator(6)
-
-    al, bet, _ = clark(np.array([u, v, w]))
+    point = tuple(int(value) for value in STATE_LATTICE[voltage_number])
+    u, v, w = phase_voltages(point)
+    al, bet = alpha_beta_str(point)
 
-    p_labels = points.get((al, bet), list())
+    p_labels = points.get(point, list())
     p_labels.append(label_format.format(*tuple(state)) + f":{convert_number_to_convention(voltage_number)}::{voltage_number}")
 
-    points[(al, bet)] = p_labels
+    points[point] = p_labels
 
-    al, bet = Fraction(al).limit_denominator(3), Fraction(bet).limit_denominator(3)
+    alpha, beta = to_alpha_beta(point)
+    alphas.append(alpha)
+    betas.append(beta)
 
-    alphas.append(al)
-    betas.append(bet)
-
-    to_print = tuple(state) + (str(u), str(v), str(w)) + (str(al), str(bet))
+    to_print = tuple(state) + (str(u), str(v), str(w)) + (al, bet)
     print(table_format.format(*to_print))
 
 
 if __name__ == "__main__":
-    table_format = " {:<4} " * 6 + " | " + " {:<4} " * 3 + " | " + " {:<4} " * 2
+    import matplotlib.pyplot as plt
+
+    table_format = " {:<4} " * 6 + " | " + " {:<4} " * 3 + " | " + " {:<7} " * 2
     header = table_format.format("U1", "V2", "W1", "U2", "V2", "W2", "U", "V", "W", "alp", "bet")
     label_format = "({},{},{})({},{},{})"
     labels = []
@@ -86,10 +82,9 @@ if __name__ == "__main__":
     plt.scatter(alphas, betas)
 
     i = 0
-    for alpha, beta in points.keys():
-        text = "\n".join(points[(alpha, beta)])
-        plt.annotate(text, (alpha, beta))
-        print("{} labels:{}".format(i, points[(alpha, beta)]))
+    for point, point_labels in points.items():
+        plt.annotate("\n".join(point_labels), tuple(to_alpha_beta(point)))
+        print("{} labels:{}".format(i, point_labels))
         i += 1
 
     plt.show()